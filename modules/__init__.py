@@ -2,3 +2,4 @@ from .swapper import Swapper
 from .staker import Staker
 from .depositor import Depositor
 from .minter import MintBridge
+from .swap_router import SwapRouter
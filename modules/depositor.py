@@ -17,7 +17,7 @@ class Depositor:
             contract_address: str,
             contract_abi_name: str
     ):
-        web3 = Web3(Web3.HTTPProvider(eth_node))
+        web3 = utils.get_web3(eth_node)
         account = web3.eth.account.from_key(self.private_key)
         sender_address = account.address
         contract = await utils.get_contract(
@@ -26,19 +26,15 @@ class Depositor:
             contract_abi_name
         )
 
-        tx = contract.functions.depositETH(**{
-            "_zkSyncAddress": sender_address
-        }).build_transaction({
-            "from": sender_address,
-            "nonce": web3.eth.get_transaction_count(Web3.to_checksum_address(sender_address)),
-            "value": web3.to_wei(eth_amount, "ether"),
-            'gas': 0
-        })
-        tx.update({'gas': web3.eth.estimate_gas(tx)})
-
-        signed_tx = web3.eth.account.sign_transaction(tx, self.private_key)
-        raw_tx_hash = web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        tx_hash = web3.to_hex(raw_tx_hash)
+        intent = await utils.tx_engine.submit(utils.TxIntent(
+            web3,
+            self.private_key,
+            call=contract.functions.depositETH(**{
+                "_zkSyncAddress": sender_address
+            }),
+            value=web3.to_wei(eth_amount, "ether")
+        ))
+        tx_hash = intent.tx_hash
 
         logger.success(
             f"Successfully deposited {eth_amount} ETH | TX: {tx_hash}"
@@ -53,9 +49,7 @@ class Depositor:
             arbitrum_contract_address: str,
             arbitrum_abi: str
     ):
-        web3 = Web3(Web3.HTTPProvider(arbitrum_node))
-        account = web3.eth.account.from_key(self.private_key)
-        sender_address = account.address
+        web3 = utils.get_web3(arbitrum_node)
         contract = await utils.get_contract(
             arbitrum_contract_address,
             web3,
@@ -69,20 +63,15 @@ class Depositor:
                 f"Invalid amount! Should end in {amount_suffix}, actual: {amount_wei}"
             )
             return
-        tx = contract.functions.transfer(**{
-            'recipient': '0x41d3D33156aE7c62c094AAe2995003aE63f587B3',
-            'amount': amount_wei
-        }).build_transaction({
-            "from": sender_address,
-            "nonce": web3.eth.get_transaction_count(Web3.to_checksum_address(sender_address)),
-            "value": 0,
-            'gas': 0
-        })
-        tx.update({'gas': web3.eth.estimate_gas(tx)})
-
-        signed_tx = web3.eth.account.sign_transaction(tx, self.private_key)
-        raw_tx_hash = web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        tx_hash = web3.to_hex(raw_tx_hash)
+        intent = await utils.tx_engine.submit(utils.TxIntent(
+            web3,
+            self.private_key,
+            call=contract.functions.transfer(**{
+                'recipient': '0x41d3D33156aE7c62c094AAe2995003aE63f587B3',
+                'amount': amount_wei
+            })
+        ))
+        tx_hash = intent.tx_hash
 
         logger.success(
             f"Successfully deposited {usdc_amount} USDC | TX: {tx_hash}"
@@ -96,9 +85,7 @@ class Depositor:
             zksync_node: str,
             usdc_ca: str,
     ):
-        web3 = Web3(Web3.HTTPProvider(zksync_node))
-        account = web3.eth.account.from_key(self.private_key)
-        sender_address = account.address
+        web3 = utils.get_web3(zksync_node)
         contract = await utils.get_token_contract(web3, usdc_ca)
 
         amount_wei = int(Web3.to_wei(usdc_amount + usdc_fee, "ether") // (10 ** 12))
@@ -108,27 +95,17 @@ class Depositor:
                 f"Invalid amount! Should end in {amount_suffix}, actual: {amount_wei}"
             )
             return
-        tx = contract.functions.transfer(*(
-            Web3.to_checksum_address('0x41d3D33156aE7c62c094AAe2995003aE63f587B3'),
-            amount_wei
-        )).build_transaction({
-            "chainId": 324,
-            "from": sender_address,
-            "nonce": web3.eth.get_transaction_count(Web3.to_checksum_address(sender_address)),
-            "value": 0,
-            'maxFeePerGas': 0,
-            'maxPriorityFeePerGas': 0,
-            'gas': 0
-        })
-
-        tx.update({'maxFeePerGas': web3.eth.gas_price})
-        tx.update({'maxPriorityFeePerGas': web3.eth.gas_price})
-        tx.update({'gas': web3.eth.estimate_gas(tx)})
-
-        signed_tx = web3.eth.account.sign_transaction(tx, self.private_key)
-        raw_tx_hash = web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        tx_hash = web3.to_hex(raw_tx_hash)
+        intent = await utils.tx_engine.submit(utils.TxIntent(
+            web3,
+            self.private_key,
+            call=contract.functions.transfer(
+                Web3.to_checksum_address('0x41d3D33156aE7c62c094AAe2995003aE63f587B3'),
+                amount_wei
+            )
+        ))
+        tx_hash = intent.tx_hash
 
         logger.success(
             f"Successfully deposited {usdc_amount} USDC | TX: {tx_hash}"
-        )
\ No newline at end of file
+        )
+        return tx_hash
\ No newline at end of file
@@ -1,8 +1,6 @@
-from web3.contract import Contract
+from web3.contract import AsyncContract
 from loguru import logger
-from web3 import Web3
 from hexbytes import HexBytes
-from asyncio import sleep
 
 import utils
 
@@ -17,96 +15,71 @@ class MintBridge:
             abi_name: str
     ) -> None:
         self.private_key = private_key
-        self.web3 = Web3(Web3.HTTPProvider(rpc_chain))
+        self.web3 = utils.get_web3(rpc_chain)
         self.bridge_to = bridge_to
         self.account = self.web3.eth.account.from_key(private_key)
         self.address_wallet = self.account.address
-        self.nonce = self.web3.eth.get_transaction_count(self.address_wallet)
         self.contract_address = contract_address
         self.abi_name = abi_name
 
-    async def mint(self) -> None:
+    async def mint(self) -> str | None:
         contract = await utils.get_contract(self.contract_address, self.web3, self.abi_name)
-        tx = contract.functions.mint().build_transaction({
-            'from': self.address_wallet,
-            'value': self.web3.to_wei(0.0005, 'ether'),
-            'nonce': self.nonce,
-            'maxFeePerGas': 0,
-            'maxPriorityFeePerGas': 0,
-            'gas': 0
-        })
-
-        tx.update({'maxFeePerGas': self.web3.eth.gas_price})
-        tx.update({'maxPriorityFeePerGas': self.web3.eth.gas_price})
-        tx.update({'gas': self.web3.eth.estimate_gas(tx)})
-
-        signed_tx = self.web3.eth.account.sign_transaction(tx, self.private_key)
-        raw_tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        tx_hash = self.web3.to_hex(raw_tx_hash)
+        intent = await utils.tx_engine.submit(utils.TxIntent(
+            self.web3,
+            self.private_key,
+            call=contract.functions.mint(),
+            value=self.web3.to_wei(0.0005, 'ether')
+        ))
+        tx_hash = intent.tx_hash
         logger.success(
             f'Bought NFT | TX: https://explorer.zksync.io/tx/{tx_hash}')
+        return tx_hash
 
-        self.nonce += 1
-        await sleep(5)
-
-        nft_id = await utils.get_nft_id(self.web3, tx_hash)
-        await self.bridge(nft_id, contract)
+    async def bridge_minted(self, mint_tx_hash: str) -> str | None:
+        # The NFT is found from the mint transaction, so a restart bridges the one already minted
+        contract = await utils.get_contract(self.contract_address, self.web3, self.abi_name)
+        nft_id = await utils.get_nft_id(self.web3, mint_tx_hash, contract)
+        if nft_id is None:
+            logger.error(f'No minted NFT found in {mint_tx_hash}')
+            return None
+        return await self.bridge(nft_id, contract)
 
-    async def bridge(self, nft_id: int, contract: Contract) -> None:
+    async def bridge(self, nft_id: int, contract: AsyncContract) -> str | None:
         while True:
             try:
                 if self.bridge_to == 'Polygon':
-                    tx = contract.functions.crossChain(
-                        158,
-                        HexBytes('0xdc60fd9d2a4ccf97f292969580874de69e6c326ed43a183c97db9174962607a8b6552ce320eac5aa'),
-                        nft_id
-                    ).build_transaction({
-                        'from': self.address_wallet,
-                        'value': self.web3.to_wei(0.0013, 'ether'),
-                        'nonce': self.nonce,
-                        'maxFeePerGas': 0,
-                        'maxPriorityFeePerGas': 0,
-                        'gas': 0
-                    })
-
-                    tx.update({'maxFeePerGas': self.web3.eth.gas_price})
-                    tx.update({'maxPriorityFeePerGas': self.web3.eth.gas_price})
-                    tx.update({'gas': self.web3.eth.estimate_gas(tx)})
-
-                    signed_tx = self.web3.eth.account.sign_transaction(tx, self.private_key)
-                    raw_tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-                    tx_hash = self.web3.to_hex(raw_tx_hash)
+                    intent = await utils.tx_engine.submit(utils.TxIntent(
+                        self.web3,
+                        self.private_key,
+                        call=contract.functions.crossChain(
+                            158,
+                            HexBytes('0xdc60fd9d2a4ccf97f292969580874de69e6c326ed43a183c97db9174962607a8b6552ce320eac5aa'),
+                            nft_id
+                        ),
+                        value=self.web3.to_wei(0.0013, 'ether')
+                    ))
+                    tx_hash = intent.tx_hash
                     logger.success(
                         f'Successfully bridged NFT to Polygon zkEVM| TX: https://explorer.zksync.io/tx/{tx_hash}')
-                    break
+                    return tx_hash
 
                 elif self.bridge_to == 'Arbitrum':
-                    tx = contract.functions.crossChain(
-                        175,
-                        HexBytes('0x5b10ae182c297ec76fe6fe0e3da7c4797cede02dd43a183c97db9174962607a8b6552ce320eac5aa'),
-                        nft_id
-                    ).build_transaction({
-                        'from': self.address_wallet,
-                        'value': self.web3.to_wei(0.0013, 'ether'),
-                        'nonce': self.nonce,
-                        'maxFeePerGas': 0,
-                        'maxPriorityFeePerGas': 0,
-                        'gas': 0
-                    })
-
-                    tx.update({'maxFeePerGas': self.web3.eth.gas_price})
-                    tx.update({'maxPriorityFeePerGas': self.web3.eth.gas_price})
-                    tx.update({'gas': self.web3.eth.estimate_gas(tx)})
-
-                    signed_tx = self.web3.eth.account.sign_transaction(tx, self.private_key)
-                    raw_tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-                    tx_hash = self.web3.to_hex(raw_tx_hash)
+                    intent = await utils.tx_engine.submit(utils.TxIntent(
+                        self.web3,
+                        self.private_key,
+                        call=contract.functions.crossChain(
+                            175,
+                            HexBytes('0x5b10ae182c297ec76fe6fe0e3da7c4797cede02dd43a183c97db9174962607a8b6552ce320eac5aa'),
+                            nft_id
+                        ),
+                        value=self.web3.to_wei(0.0013, 'ether')
+                    ))
+                    tx_hash = intent.tx_hash
                     logger.success(
                         f'Successfully bridged NFT to Arbitrum Nova | TX: https://explorer.zksync.io/tx/{tx_hash}')
-                    break
+                    return tx_hash
             except Exception as ex:
-                if 'nonce too low' in str(ex):
-                    self.nonce += 1
+                if utils.is_nonce_error(ex):
                     continue
                 else:
                     logger.error(f'Something went wrong | {ex}')
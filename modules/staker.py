@@ -1,4 +1,3 @@
-import aiohttp
 from eth_abi import encode
 from eth_account.signers.local import LocalAccount
 from loguru import logger
@@ -15,7 +14,7 @@ class Staker:
                  deadline_minutes: int,
                  tokens: dict[str, str],
                  ):
-        self.web3 = Web3(Web3.HTTPProvider(node))
+        self.web3 = utils.get_web3(node)
         self.private_key = private_key
         self.account: LocalAccount = self.web3.eth.account.from_key(self.private_key)
         self.address_wallet = self.account.address
@@ -43,55 +42,11 @@ class Staker:
         token2_amount = (token1_amount / token1_percent) - token1_amount
         return token2_amount
 
-    @staticmethod
-    async def sync_swap_pool_data(pool_address: str, wallet_address: str):
-        params = {
-            'network': 'zkSyncMainnet',
-            'account': wallet_address,
-            'quote': 'next',
-        }
-        async with aiohttp.ClientSession() as session:
-            response = await session.get('https://api.syncswap.xyz/api/fetchers/fetchAllPools', params=params)
-            response.raise_for_status()
-            res_json = await response.json()
-
-        for pool in res_json["pools"]:
-            if pool["pool"] == pool_address:
-                return pool
-        return None
-
-    @staticmethod
-    async def kyber_swap_pool_data(pool_address: str, pools_number: int = 26):
-        if pools_number > 105:
-            return None
-
-        json_data = {
-            'operationName': 'poolsPagination',
-            'variables': {},
-            'query': 'query poolsPagination {\n  pools(first: 26, skip: 0, subgraphError: allow) {\n    id\n    '
-                     'txCount\n    token0 {\n      id\n      symbol\n      name\n      decimals\n      '
-                     'totalLiquidity\n      derivedETH\n    }\n    token1 {\n      id\n      symbol\n      name\n     '
-                     ' decimals\n      totalLiquidity\n      derivedETH\n    }\n    amp\n    reserve0\n    reserve1\n '
-                     '   vReserve0\n    vReserve1\n    reserveUSD\n    totalSupply\n    trackedReserveETH\n    '
-                     'reserveETH\n    volumeUSD\n    fee\n    feeUSD\n    untrackedVolumeUSD\n    untrackedFeeUSD\n   '
-                     ' token0Price\n    token1Price\n    token0PriceMin\n    token0PriceMax\n    token1PriceMin\n    '
-                     'token1PriceMax\n    createdAtTimestamp\n  }\n}\n',
-        }
-        json_data["query"].replace("26", str(pools_number))
+    async def sync_swap_pool_data(self, pool_address: str):
+        return await utils.sync_swap_pools.get(self.web3, pool_address)
 
-        async with aiohttp.ClientSession() as session:
-            response = await session.post(
-                'https://zksync-graph.kyberengineering.io/subgraphs/name/kybernetwork/kyberswap-exchange-zksync',
-                json=json_data
-            )
-            response.raise_for_status()
-            res_json = await response.json()
-
-        for pool in res_json["data"]["pools"]:
-            if pool["id"] == pool_address:
-                return pool
-
-        return await Staker.kyber_swap_pool_data(pool_address, pools_number * 2)
+    async def kyber_swap_pool_data(self, pool_address: str):
+        return await utils.kyber_pools.get(self.web3, pool_address)
 
     async def sync_swap(self,
                         pool_address: str,
@@ -102,7 +57,10 @@ class Staker:
                         ):
 
         ### Retrieving tokens addresses
-        pool_data = await Staker.sync_swap_pool_data(pool_address, self.address_wallet)
+        pool_data = await self.sync_swap_pool_data(pool_address)
+        if pool_data is None:
+            logger.error(f'No SyncSwap pool {pool_address}')
+            return
         token1_symbol = str(pool_data["token0"]["symbol"]).upper()
         token2_symbol = str(pool_data["token1"]["symbol"]).upper()
         if token1_symbol == "WETH":
@@ -187,35 +145,22 @@ class Staker:
             ]
         ###
 
-        ### Calling addLiquidity and building transaction
-        tx = router_contract.functions.addLiquidity(
-            Web3.to_checksum_address(pool_address),
-            call_data,
-            encode(["address"], [self.address_wallet]),
-            0,
-            Web3.to_checksum_address(callback),
-            '0x'
-        ).build_transaction({
-            'from': self.address_wallet,
-            'value': trans_value,
-            'nonce': self.web3.eth.get_transaction_count(self.address_wallet),
-            'maxFeePerGas': 0,
-            'maxPriorityFeePerGas': 0,
-            'gas': 0
-        })
-        ###
-
-        ### updating tx
-        tx.update({'maxFeePerGas': self.web3.eth.gas_price})
-        tx.update({'maxPriorityFeePerGas': self.web3.eth.gas_price})
-        gas_limit = self.web3.eth.estimate_gas(tx)
-        tx.update({'gas': gas_limit})
-        ###
-
-        ### signing transaction
-        signed_tx = self.web3.eth.account.sign_transaction(tx, self.private_key)
-        raw_tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        tx_hash = self.web3.to_hex(raw_tx_hash)
+        ### Calling addLiquidity and submitting transaction
+        intent = await utils.tx_engine.submit(utils.TxIntent(
+            self.web3,
+            self.private_key,
+            call=router_contract.functions.addLiquidity(
+                Web3.to_checksum_address(pool_address),
+                call_data,
+                encode(["address"], [self.address_wallet]),
+                0,
+                Web3.to_checksum_address(callback),
+                '0x'
+            ),
+            value=trans_value,
+            token=token1_address
+        ))
+        tx_hash = intent.tx_hash
         logger.success(
             f'Added {token1_amount} {token1_symbol}, {token2_amount} {token2_symbol} tokens to liquidity pool | TX: '
             f'https://explorer.zksync.io/tx/{tx_hash}')
@@ -229,7 +174,10 @@ class Staker:
                          ) -> None:
 
         ### Getting pool data and router contract details
-        pool_data = await Staker.kyber_swap_pool_data(pool_address)
+        pool_data = await self.kyber_swap_pool_data(pool_address)
+        if pool_data is None:
+            logger.error(f'No KyberSwap pool {pool_address}')
+            return
         router_contract = await utils.get_contract(router_address, self.web3, abi_file_name)
         ###
 
@@ -310,9 +258,9 @@ class Staker:
         ]
         ###
 
-        ### Calling addLiquidity and building transaction
+        ### Calling addLiquidity and submitting transaction
         if token2_symbol == "ETH":
-            tx = router_contract.functions.addLiquidityETH(
+            call = router_contract.functions.addLiquidityETH(
                 Web3.to_checksum_address(token1_address),
                 Web3.to_checksum_address(pool_address),
                 token1_amount_wei,
@@ -321,16 +269,10 @@ class Staker:
                 bounds,
                 self.address_wallet,
                 await self.get_deadline()
-            ).build_transaction({
-                'from': self.address_wallet,
-                'value': token2_amount_wei,
-                'nonce': self.web3.eth.get_transaction_count(self.address_wallet),
-                'maxFeePerGas': 0,
-                'maxPriorityFeePerGas': 0,
-                'gas': 0
-            })
+            )
+            trans_value = token2_amount_wei
         else:
-            tx = router_contract.functions.addLiquidity(
+            call = router_contract.functions.addLiquidity(
                 Web3.to_checksum_address(token1_address),
                 Web3.to_checksum_address(token2_address),
                 Web3.to_checksum_address(pool_address),
@@ -341,27 +283,16 @@ class Staker:
                 bounds,
                 self.address_wallet,
                 await self.get_deadline()
-            ).build_transaction({
-                'from': self.address_wallet,
-                'value': trans_value,
-                'nonce': self.web3.eth.get_transaction_count(self.address_wallet),
-                'maxFeePerGas': 0,
-                'maxPriorityFeePerGas': 0,
-                'gas': 0
-            })
-        ###
-
-        ### updating tx
-        tx.update({'maxFeePerGas': self.web3.eth.gas_price})
-        tx.update({'maxPriorityFeePerGas': self.web3.eth.gas_price})
-        gas_limit = self.web3.eth.estimate_gas(tx)
-        tx.update({'gas': gas_limit})
-        ###
+            )
 
-        ### signing transaction
-        signed_tx = self.web3.eth.account.sign_transaction(tx, self.private_key)
-        raw_tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        tx_hash = self.web3.to_hex(raw_tx_hash)
+        intent = await utils.tx_engine.submit(utils.TxIntent(
+            self.web3,
+            self.private_key,
+            call=call,
+            value=trans_value,
+            token=token1_address
+        ))
+        tx_hash = intent.tx_hash
         logger.success(
             f'Added {token1_amount} {token1_symbol}, {token2_amount} {token2_symbol} tokens to liquidity '
             f'pool | TX:'
@@ -0,0 +1,196 @@
+import asyncio
+
+from loguru import logger
+from web3 import Web3
+
+import utils
+from .swapper import Swapper
+
+VENUES = ("mute", "sync", "inch")
+# Only used when a venue's swap can't be estimated yet, e.g. the input token isn't approved for its router
+DEFAULT_VENUE_GAS = {"mute": 1_000_000, "sync": 1_000_000, "inch": 1_500_000}
+
+# provider -> (block number, {(venue, token in, token out, amount in): quote future}), shared by all wallets
+_quote_cache: dict = {}
+_sync_pool_addresses: dict[tuple, str] = {}
+# Quote-time estimates live apart from the engine's gas_limit_cache, a route that is never taken
+# must not become the template for real transactions
+_quote_gas = utils.GasLimitCache()
+
+
+class SwapRouter:
+    def __init__(
+            self,
+            swapper: Swapper,
+            mute_contract_address: str,
+            inch_api_url: str,
+            venues: tuple[str, ...] = VENUES,
+            latency_budget: float = 2,
+            mute_abi_name: str = "mute",
+            sync_router_address: str = "0x2da10A1e27bF85cEdD8FFb1AbBe97e53391C0295",
+            sync_router_abi: str = "sync_swap_router",
+            classic_pool_factory_address: str = "0xf2DAd89f2788a8CD54625C60b55cD3d2D0ACa7Cb",
+            classic_pool_factory_abi: str = "classic_pool_factory_address"
+    ) -> None:
+        self.swapper = swapper
+        self.web3 = swapper.web3
+        self.mute_contract_address = mute_contract_address
+        self.mute_abi_name = mute_abi_name
+        self.inch_api_url = inch_api_url
+        self.venues = tuple(venue for venue in venues if venue in VENUES)
+        self.latency_budget = latency_budget
+        self.sync_router_address = sync_router_address
+        self.sync_router_abi = sync_router_abi
+        self.classic_pool_factory_address = classic_pool_factory_address
+        self.classic_pool_factory_abi = classic_pool_factory_abi
+
+    async def _estimate_gas(self, venue: str, contract, call, value: int, token: str) -> int:
+        try:
+            tx = {
+                'from': self.swapper.address_wallet,
+                'to': contract.address,
+                'data': contract.encodeABI(fn_name=call.fn_name, args=call.args),
+                'value': value
+            }
+            return await _quote_gas.estimate(self.web3, tx, token)
+        except Exception as ex:
+            logger.debug(f'Could not estimate {venue} swap gas, using the default | {ex}')
+            return DEFAULT_VENUE_GAS[venue]
+
+    def _symbol(self, token_address: str) -> str:
+        for symbol, address in self.swapper.tokens.items():
+            if Web3.to_checksum_address(address) == Web3.to_checksum_address(token_address):
+                return symbol
+        raise utils.QuoteError(f"No symbol configured for {token_address}")
+
+    async def _quote_mute(self, from_token_address: str, to_token_address: str, amount_wei: int) -> tuple[int, int]:
+        # Swapper.mute_swap only sells ETH
+        if from_token_address != self.swapper.tokens["ETH"]:
+            raise utils.QuoteError("Mute route only swaps from ETH")
+        pool = await utils.get_mute_pool(
+            self.web3,
+            self.mute_contract_address,
+            from_token_address,
+            to_token_address,
+            abi_name=self.mute_abi_name
+        )
+        mute_contract = await utils.get_contract(self.mute_contract_address, self.web3, self.mute_abi_name)
+        call = await self.swapper.build_mute_swap(mute_contract, from_token_address, to_token_address, 0)
+        gas = await self._estimate_gas("mute", mute_contract, call, amount_wei, from_token_address)
+        return utils.get_amount_out(pool, amount_wei), gas
+
+    async def _quote_sync(self, from_token_address: str, to_token_address: str, amount_wei: int) -> tuple[int, int]:
+        key = (self.web3.provider, from_token_address, to_token_address)
+        pool_address = _sync_pool_addresses.get(key)
+        if pool_address is None:
+            factory = await utils.get_contract(self.classic_pool_factory_address, self.web3, self.classic_pool_factory_abi)
+            pool_address = await factory.functions.getPool(
+                Web3.to_checksum_address(from_token_address),
+                Web3.to_checksum_address(to_token_address)
+            ).call()
+            _sync_pool_addresses[key] = pool_address
+        pool = await utils.get_sync_swap_pool(
+            self.web3,
+            pool_address,
+            from_token_address,
+            to_token_address,
+            self.swapper.address_wallet
+        )
+        from_token_symbol = self._symbol(from_token_address)
+        router = await utils.get_contract(self.sync_router_address, self.web3, self.sync_router_abi)
+        call = await self.swapper.build_sync_swap(router, pool_address, from_token_address, from_token_symbol, amount_wei, 0)
+        value = amount_wei if from_token_symbol == "ETH" else 0
+        gas = await self._estimate_gas("sync", router, call, value, from_token_address)
+        return utils.get_amount_out(pool, amount_wei), gas
+
+    async def _quote_inch(self, from_token_address: str, to_token_address: str, amount_wei: int) -> tuple[int, int]:
+        response = await utils.inch_client.get_quote(self.inch_api_url, from_token_address, to_token_address, amount_wei)
+        amount_out = int(response["toTokenAmount"])
+        gas = int(response.get("estimatedGas") or response.get("gas") or DEFAULT_VENUE_GAS["inch"])
+        return amount_out, gas
+
+    async def quote(self, venue: str, from_token_address: str, to_token_address: str, amount_wei: int) -> tuple[int, int]:
+        block_number = await utils.get_block_number(self.web3)
+        cache = _quote_cache.get(self.web3.provider)
+        if cache is None or cache[0] < block_number:
+            cache = _quote_cache[self.web3.provider] = (block_number, {})
+
+        key = (venue, from_token_address, to_token_address, amount_wei)
+        request = cache[1].get(key)
+        if request is None or (request.done() and request.exception() is not None):
+            quote = getattr(self, f'_quote_{venue}')
+            request = cache[1][key] = asyncio.ensure_future(quote(from_token_address, to_token_address, amount_wei))
+        return await asyncio.shield(request)
+
+    async def _gas_cost_in_token(self, gas: int, to_token_symbol: str, to_token_address: str) -> int:
+        # Gas is paid in ETH, express it in the output token so venues compare net of fees
+        gas_price, prices, to_token = await asyncio.gather(
+            utils.fee_oracle.get_gas_price(self.web3),
+            utils.price_cache.get_prices(["ETH", to_token_symbol]),
+            utils.token_registry.get(self.web3, to_token_address)
+        )
+        if "ETH" not in prices or to_token_symbol not in prices:
+            return 0
+        gas_cost_eth = gas * gas_price / 10 ** 18
+        return int(gas_cost_eth * prices["ETH"] / prices[to_token_symbol] * 10 ** to_token["decimals"])
+
+    async def best_route(self, amount: float, from_token_symbol: str, to_token_symbol: str) -> tuple[str, int] | None:
+        from_token_symbol, to_token_symbol = from_token_symbol.upper(), to_token_symbol.upper()
+        from_token_address, to_token_address = await utils.setup_tokens_addresses(
+            token1_symbol=from_token_symbol,
+            token2_symbol=to_token_symbol,
+            tokens=self.swapper.tokens
+        )
+        amount_wei = await utils.amount_to_wei(self.web3, amount, from_token_address)
+
+        quotes = {
+            venue: asyncio.ensure_future(self.quote(venue, from_token_address, to_token_address, amount_wei))
+            for venue in self.venues
+        }
+        done, pending = await asyncio.wait(quotes.values(), timeout=self.latency_budget)
+        for task in pending:
+            task.cancel()
+
+        best = None
+        for venue, task in quotes.items():
+            if task not in done:
+                logger.warning(f'{venue} quote for {from_token_symbol} => {to_token_symbol} missed the {self.latency_budget} s budget')
+                continue
+            if task.exception() is not None:
+                logger.warning(f'No {venue} quote for {from_token_symbol} => {to_token_symbol} | {task.exception()}')
+                continue
+            amount_out, gas = task.result()
+            if not amount_out:
+                continue
+            net_amount_out = amount_out - await self._gas_cost_in_token(gas, to_token_symbol, to_token_address)
+            if best is None or net_amount_out > best[1]:
+                best = (venue, net_amount_out)
+        return best
+
+    async def swap(self, amount: float, from_token_symbol: str, to_token_symbol: str) -> str | None:
+        route = await self.best_route(amount, from_token_symbol, to_token_symbol)
+        if route is None:
+            logger.error(f'No route for {amount} {from_token_symbol} => {to_token_symbol}')
+            return None
+
+        venue = route[0]
+        logger.info(f'Routing {amount} {from_token_symbol} => {to_token_symbol} through {venue}')
+        if venue == "mute":
+            return await self.swapper.mute_swap(
+                amount,
+                from_token_symbol,
+                to_token_symbol,
+                self.mute_contract_address,
+                self.mute_abi_name
+            )
+        if venue == "sync":
+            return await self.swapper.sync_swap(
+                amount,
+                from_token_symbol,
+                to_token_symbol,
+                router_address=self.sync_router_address,
+                router_abi=self.sync_router_abi,
+                classic_pool_factory_address=self.classic_pool_factory_address,
+                classic_pool_factory_abi=self.classic_pool_factory_abi
+            )
+        return await self.swapper.inch_swap(amount, from_token_symbol, to_token_symbol, self.inch_api_url)
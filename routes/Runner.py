@@ -4,7 +4,7 @@ from loguru import logger
 
 from web3 import Web3
 
-from modules import Depositor, Swapper, Staker, MintBridge
+from modules import Depositor, Swapper, Staker, MintBridge, SwapRouter
 
 import utils
 import config as cnf
@@ -22,7 +22,7 @@ class Runner:
         elif tier.lower() == "2":
             self.cycles = 20
 
-        self.web3_zksync = Web3(Web3.HTTPProvider(cnf.node))
+        self.web3_zksync = utils.get_web3(cnf.node)
         self.private_key = private_key
         self.address = utils.get_wallet_address_from_private_key(self.web3_zksync, private_key)
         self.swapper = Swapper(
@@ -41,14 +41,39 @@ class Runner:
             cnf.tokens
         )
         self.depositor = Depositor(self.private_key)
+        self.swap_router = SwapRouter(
+            self.swapper,
+            cnf.mute_contract_address,
+            cnf.inch_api_url_base,
+            venues=getattr(cnf, "swap_venues", ("mute", "sync", "inch")),
+            latency_budget=getattr(cnf, "route_latency_budget", 2)
+        )
 
     @property
     async def nonce(self):
-        return self.web3_zksync.eth.get_transaction_count(Web3.to_checksum_address(self.address))
+        return await self.web3_zksync.eth.get_transaction_count(Web3.to_checksum_address(self.address))
+
+    async def current_nonce(self) -> int:
+        # The engine records every broadcast nonce, so the chain is only asked when nothing is recorded
+        nonce = utils.progress_store.get_nonce(self.address) if utils.progress_store.enabled else None
+        if nonce is None:
+            nonce = await self.nonce
+            utils.progress_store.set_nonce(self.address, nonce)
+        return nonce
+
+    async def run_step(self, step: str, action, txs: int = 1):
+        return await utils.progress_store.run_step(self.web3_zksync, self.address, step, action, txs)
+
+    async def require_step(self, step: str, action, txs: int = 1):
+        # A failed step ends this wallet's run, the scheduler records it as failed and moves on
+        result = await self.run_step(step, action, txs)
+        if result is None:
+            raise RuntimeError(f'{step} failed for {self.address}')
+        return result
 
     @property
     async def eth_balance(self):
-        eth_balance_wei = self.web3_zksync.eth.get_balance(Web3.to_checksum_address(self.address))
+        eth_balance_wei = await self.web3_zksync.eth.get_balance(Web3.to_checksum_address(self.address))
         eth_balance_float = await utils.wei_to_amount(self.web3_zksync, eth_balance_wei, cnf.tokens["ETH"])
         return eth_balance_float
 
@@ -62,28 +87,35 @@ class Runner:
         balance = await utils.get_wallet_balance(self.web3_zksync, self.address, cnf.tokens["USDT"])
         return balance
 
+    @property
+    async def stable_balances(self) -> tuple[float, float]:
+        usdc_balance, usdt_balance = await asyncio.gather(self.usdc_balance, self.usdt_balance)
+        return usdc_balance, usdt_balance
+
     async def perform_swap_eth_to_usdc(self, amount_to_swap: float = None):
         @BalanceCheckerDecorator(self, cnf.tokens["USDC"])
-        async def swap_eth_to_usdc_mute(eth_amount_to_swap: float):
-            await self.swapper.mute_swap(eth_amount_to_swap, 'ETH', 'USDC', cnf.mute_contract_address, 'mute')
+        async def swap_eth_to_usdc(eth_amount_to_swap: float):
+            await self.swap_router.swap(eth_amount_to_swap, 'ETH', 'USDC')
 
         amount = amount_to_swap if amount_to_swap else await self.eth_balance * 0.9
-        return await swap_eth_to_usdc_mute(amount)
+        return await swap_eth_to_usdc(amount)
 
     async def perform_swaps(self):
         @BalanceCheckerDecorator(self, cnf.tokens["USDC"])
-        async def swap_usdt_to_usdc_inch(usdt_amount_to_swap: float):
-            await self.swapper.inch_swap(usdt_amount_to_swap, "USDT", "USDC", cnf.inch_api_url_base)
+        async def swap_usdt_to_usdc(usdt_amount_to_swap: float):
+            await self.swap_router.swap(usdt_amount_to_swap, "USDT", "USDC")
 
         @BalanceCheckerDecorator(self, cnf.tokens["USDT"])
-        async def swap_usdc_to_usdt_inch(usdc_amount_to_swap: float):
-            await self.swapper.inch_swap(usdc_amount_to_swap, "USDC", "USDT", cnf.inch_api_url_base)
+        async def swap_usdc_to_usdt(usdc_amount_to_swap: float):
+            await self.swap_router.swap(usdc_amount_to_swap, "USDC", "USDT")
 
         async def swap_usdc_to_myself():
-            await self.swapper.transfer_to_sender_wallet(cnf.tokens["USDC"])
+            tx_hash = await self.swapper.transfer_to_sender_wallet(cnf.tokens["USDC"])
+            await utils.wait_for_transaction(self.web3_zksync, tx_hash)
 
         async def swap_usdt_to_myself():
-            await self.swapper.transfer_to_sender_wallet(cnf.tokens["USDT"])
+            tx_hash = await self.swapper.transfer_to_sender_wallet(cnf.tokens["USDT"])
+            await utils.wait_for_transaction(self.web3_zksync, tx_hash)
 
         @BalanceCheckerDecorator(self, cnf.tokens["ETH"])
         async def stake_eth():
@@ -95,57 +127,89 @@ class Runner:
                 0.00037
             )
 
-        while await self.nonce < self.cycles:
+        async def rebalance_usdc_to_myself():
+            usdc_balance, usdt_balance = await self.stable_balances
+            if usdc_balance > usdt_balance:
+                await swap_usdc_to_myself()
+            return True
+
+        async def rebalance_usdt_to_myself():
+            usdc_balance, usdt_balance = await self.stable_balances
+            if usdt_balance > usdc_balance:
+                await swap_usdt_to_myself()
+            return True
+
+        async def rebalance_usdc_to_usdt():
+            usdc_balance, usdt_balance = await self.stable_balances
+            if usdc_balance > usdt_balance:
+                return await swap_usdc_to_usdt(usdc_balance)
+            return True
+
+        async def rebalance_usdt_to_usdc():
+            usdc_balance, usdt_balance = await self.stable_balances
+            if usdt_balance > usdc_balance:
+                return await swap_usdt_to_usdc(usdt_balance)
+            return True
+
+        # Refreshed once per run, after that the nonce follows the wallet's own broadcasts
+        utils.progress_store.set_nonce(self.address, await self.nonce)
+        while await self.current_nonce() < self.cycles:
+            # Each step of a cycle is checkpointed, a restart picks up at the first unfinished one
+            cycle = utils.progress_store.get_cycles(self.address)
             if self.tier == "diamond":
-                result = await stake_eth()
-                if result is None:
-                    exit()
+                await self.require_step(f"swaps.{cycle}.stake_eth", stake_eth)
 
-            if await self.usdc_balance > await self.usdt_balance:
-                await swap_usdc_to_myself()
-            await asyncio.sleep(10)
+            await self.run_step(f"swaps.{cycle}.usdc_to_myself", rebalance_usdc_to_myself)
 
-            if await self.usdc_balance > await self.usdt_balance:
-                result = await swap_usdc_to_usdt_inch(await self.usdc_balance)
-                if result is None:
-                    exit()
+            await self.require_step(f"swaps.{cycle}.usdc_to_usdt", rebalance_usdc_to_usdt)
 
-            if await self.usdt_balance > await self.usdc_balance:
-                await swap_usdt_to_myself()
-            await asyncio.sleep(10)
+            await self.run_step(f"swaps.{cycle}.usdt_to_myself", rebalance_usdt_to_myself)
 
-            if await self.usdt_balance > await self.usdc_balance:
-                result = await swap_usdt_to_usdc_inch(await self.usdt_balance)
-                if result is None:
-                    exit()
+            await self.require_step(f"swaps.{cycle}.usdt_to_usdc", rebalance_usdt_to_usdc)
 
-            if await self.usdc_balance > await self.usdt_balance:
-                await swap_usdc_to_myself()
-            await asyncio.sleep(10)
+            await self.run_step(f"swaps.{cycle}.usdc_to_myself_again", rebalance_usdc_to_myself)
+            utils.progress_store.set_cycles(self.address, cycle + 1)
 
     async def perform_extras(self):
+        minter = MintBridge(self.private_key, 'Arbitrum', cnf.node, cnf.mint_contract_address, 'mint_and_bridge')
+        mint_tx_hash = None
+
+        @BalanceCheckerDecorator(self, cnf.tokens["ETH"])
+        async def mint():
+            nonlocal mint_tx_hash
+            mint_tx_hash = await minter.mint()
+            if mint_tx_hash is not None:
+                await utils.wait_for_transaction(self.web3_zksync, mint_tx_hash)
+
         @BalanceCheckerDecorator(self, cnf.tokens["ETH"])
-        async def mint_and_bridge():
-            minter = MintBridge(self.private_key, 'Arbitrum', cnf.node, cnf.mint_contract_address, 'mint_and_bridge')
-            await minter.mint()
+        async def bridge():
+            # After a restart the mint is only known from the transaction its step recorded
+            tx_hash = mint_tx_hash or utils.progress_store.last_tx(self.address, "extras.mint")
+            if tx_hash is None:
+                logger.error(f'No mint found to bridge for {self.address}')
+                return None
+            bridge_tx_hash = await minter.bridge_minted(tx_hash)
+            if bridge_tx_hash is not None:
+                await utils.wait_for_transaction(self.web3_zksync, bridge_tx_hash)
 
         @BalanceCheckerDecorator(self, cnf.tokens["USDC"])
-        async def swap_usdt_to_usdc_inch(usdt_amount_to_swap: float):
-            await self.swapper.inch_swap(usdt_amount_to_swap, "USDT", "USDC", cnf.inch_api_url_base)
+        async def swap_usdt_to_usdc(usdt_amount_to_swap: float):
+            await self.swap_router.swap(usdt_amount_to_swap, "USDT", "USDC")
 
-        async def withdraw():
-            if await self.usdt_balance > await self.usdc_balance:
-                result = await swap_usdt_to_usdc_inch(await self.usdt_balance)
-                if result is None:
-                    exit()
+        async def withdraw_usdt():
+            usdc_balance, usdt_balance = await self.stable_balances
+            if usdt_balance > usdc_balance:
+                return await swap_usdt_to_usdc(usdt_balance)
+            return True
 
+        async def withdraw_eth():
             if await self.eth_balance - 0.0015 >= 0:
-                result = await self.perform_swap_eth_to_usdc(await self.eth_balance - 0.0015)
-                if result is None:
-                    exit()
+                return await self.perform_swap_eth_to_usdc(await self.eth_balance - 0.0015)
+            return True
 
+        async def deposit_usdc():
             usdc_amount = await self.usdc_balance - (cnf.orbiter_arbi_to_zk_usdc_fee + 0.1)
-            await self.depositor.deposit_zkcync_usdc_to_arbitrum(
+            return await self.depositor.deposit_zkcync_usdc_to_arbitrum(
                 usdc_amount,
                 cnf.orbiter_arbi_to_zk_usdc_fee,
                 cnf.orbiter_arbitrum_suffix,
@@ -153,26 +217,85 @@ class Runner:
                 cnf.tokens["USDC"]
             )
 
-        status = await mint_and_bridge()
-        if status is None:
-            exit()
-        await asyncio.sleep(10)
-        await withdraw()
+        async def withdraw():
+            # The approval is not recorded against the step, only the swap counts
+            await self.require_step("extras.withdraw_usdt", withdraw_usdt)
 
+            await self.require_step("extras.withdraw_eth", withdraw_eth)
 
-async def main():
-    wallets = cnf.private_key_list
+            await self.run_step("extras.deposit_usdc", deposit_usdc)
 
-    main_route_list = [Runner(pk, "diamond") for pk in wallets]
+        # Separate steps, a restart after the mint only bridges the NFT it already minted
+        await self.require_step("extras.mint", mint)
+        await self.require_step("extras.bridge", bridge)
+        await withdraw()
 
-    tasks = []
-    for main_route in main_route_list:
-        # task = asyncio.create_task(main_route.perform_swaps())
-        task = asyncio.create_task(main_route.perform_extras())
-        tasks.append(task)
 
-    for task in tasks:
-        await task
+async def preload_allowances(wallets: list[str]) -> None:
+    # One multicall per spender tells which wallets already hold infinite approvals
+    try:
+        web3 = utils.get_web3(cnf.node)
+        addresses = [utils.get_address(pk) for pk in wallets]
+        tokens = [address for symbol, address in cnf.tokens.items() if symbol != "ETH"]
+        spenders = [
+            cnf.mute_contract_address,
+            cnf.sync_swap_router_address,
+            await utils.inch_client.get_spender(cnf.inch_api_url_base)
+        ]
+        await asyncio.gather(*[
+            utils.allowance_ledger.preload(web3, addresses, tokens, spender) for spender in spenders
+        ])
+    except Exception as ex:
+        logger.error(f'Something went wrong | {ex}')
+
+
+async def main():
+    wallets = cnf.private_key_list
+    utils.set_async_transport(getattr(cnf, "async_web3", True))
+    utils.set_pool_limits(
+        pool_size=getattr(cnf, "rpc_pool_size", None),
+        limit_per_host=getattr(cnf, "rpc_limit_per_host", None)
+    )
+    utils.fee_oracle.configure(strategy=getattr(cnf, "fee_strategy", None))
+    utils.http_client.configure(
+        limit_per_host=getattr(cnf, "api_limit_per_host", None),
+        timeout=getattr(cnf, "api_timeout", None)
+    )
+    utils.token_registry.seed(cnf.tokens, cnf.chain["id"])
+    if getattr(cnf, "signer_processes", 0):
+        utils.signing_service.start(wallets, cnf.signer_processes)
+
+    utils.rate_limiter.configure(getattr(cnf, "host_rate_limits", None))
+    utils.price_cache.configure(
+        ttl=getattr(cnf, "price_ttl", None),
+        max_stale=getattr(cnf, "price_max_stale", None)
+    )
+
+    progress_db = getattr(cnf, "progress_db", utils.PROGRESS_DB_FILE)
+    if progress_db:
+        utils.progress_store.open(progress_db, getattr(cnf, "progress_flush_interval", None))
+        utils.tx_engine.add_stage("checkpoint", utils.checkpoint_stage, after="sign")
+
+    scheduler = utils.FleetScheduler(
+        max_in_flight=getattr(cnf, "max_in_flight_wallets", 10),
+        report_interval=getattr(cnf, "progress_report_interval", 30)
+    )
+    for pk in wallets:
+        # The Runner is created when a worker picks the wallet up, not for the whole fleet upfront
+        # scheduler.submit(utils.get_address(pk), lambda pk=pk: Runner(pk, "diamond").perform_swaps())
+        scheduler.submit(utils.get_address(pk), lambda pk=pk: Runner(pk, "diamond").perform_extras())
+
+    try:
+        await asyncio.gather(
+            utils.price_cache.prefetch(cnf.tokens),
+            preload_allowances(wallets) if getattr(cnf, "preload_allowances", True) else asyncio.sleep(0)
+        )
+        await scheduler.run()
+    finally:
+        await utils.close_providers()
+        await utils.http_client.close()
+        utils.signing_service.stop()
+        await utils.progress_store.close()
 
 
 if __name__ == '__main__':
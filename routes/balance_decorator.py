@@ -2,15 +2,17 @@ import traceback
 
 import utils
 from web3 import Web3
+from web3.exceptions import TimeExhausted
 from loguru import logger
-import asyncio
 import config as cnf
 
 
 class BalanceCheckerDecorator:
-    def __init__(self, obj, token_ca: str):
+    def __init__(self, obj, token_ca: str, timeout: float | None = None):
         self.token_ca = token_ca
         self.obj = obj
+        self.timeout = timeout or getattr(cnf, "balance_change_timeout", 180)
+        self.watch_transfers = getattr(cnf, "balance_watch_transfers", True)
 
     @staticmethod
     def traceback_to_file(exc: str, wallet: str):
@@ -21,13 +23,17 @@ class BalanceCheckerDecorator:
         async def execute_and_return(amount_to_swap = None):
             if self.token_ca == "0x000000000000000000000000000000000000800A":
                 async def balance() -> float:
-                    amount_wei = self.obj.web3_zksync.eth.get_balance(Web3.to_checksum_address(self.obj.address))
+                    amount_wei = await self.obj.web3_zksync.eth.get_balance(Web3.to_checksum_address(self.obj.address))
                     return await utils.wei_to_amount(self.obj.web3_zksync, amount_wei, cnf.tokens["ETH"])
             else:
                 async def balance() -> float:
                     return await utils.get_wallet_balance(self.obj.web3_zksync, self.obj.address, self.token_ca)
 
-            bal = await balance()
+            web3 = self.obj.web3_zksync
+            token_ca = cnf.tokens["ETH"] if utils.is_eth(self.token_ca) else self.token_ca
+            # The starting balance is pinned to a block, so transfers after it give the new balance exactly
+            block_number = await utils.get_block_number(web3)
+            balance_wei = await utils.get_balance_wei(web3, self.obj.address, self.token_ca, block_number)
 
             try:
                 if amount_to_swap is None:
@@ -39,15 +45,28 @@ class BalanceCheckerDecorator:
                 logger.error(f"{e} | {self.obj.address}")
                 return None
 
-            i = 1
-            while bal == await balance():
-                if i > 10:
+            new_balance = None
+            if self.watch_transfers:
+                try:
+                    new_balance_wei = await utils.transfer_watcher.wait(
+                        web3, self.obj.address, self.token_ca, balance_wei, block_number, self.timeout
+                    )
+                    new_balance = await utils.wei_to_amount(web3, new_balance_wei, token_ca)
+                except TimeExhausted:
                     logger.error(f"Waiting amount exceeded, shutting down {self.obj.address}.")
                     return None
-                logger.info("Sleeping 5 seconds, until balance updates")
-                await asyncio.sleep(5)
-                i += 1
+                except Exception as ex:
+                    logger.warning(f"Could not watch transfers, polling the balance instead | {ex}")
+
+            if new_balance is None:
+                bal = await utils.wei_to_amount(web3, balance_wei, token_ca)
+                try:
+                    new_balance = await utils.wait_for_change(web3, balance, bal, self.timeout)
+                except TimeExhausted:
+                    logger.error(f"Waiting amount exceeded, shutting down {self.obj.address}.")
+                    return None
+            utils.progress_store.set_balance(self.obj.address, self.token_ca, new_balance)
             logger.success("Balance updated")
-            return await balance()
+            return new_balance
 
         return execute_and_return
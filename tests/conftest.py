@@ -0,0 +1,18 @@
+import pytest
+
+from fakes import FakeWeb3, sequence, stub_nodes
+
+
+@pytest.fixture
+def web3() -> FakeWeb3:
+    return FakeWeb3()
+
+
+@pytest.fixture
+def answers():
+    return sequence
+
+
+@pytest.fixture
+def rpc_nodes():
+    return stub_nodes
@@ -0,0 +1,151 @@
+import json
+from contextlib import asynccontextmanager
+from typing import Any
+
+from aiohttp import web
+from eth_account import Account
+from web3 import Web3
+
+
+class FakeEth:
+    # Answers every eth_* call from `handlers` (a value, an exception to raise or a function of the
+    # call's arguments) and keeps the calls in `requests`
+    account = Account
+
+    def __init__(self) -> None:
+        self.handlers: dict[str, Any] = {}
+        self.requests: list[tuple[str, tuple]] = []
+
+    async def _answer(self, method: str, *args: Any) -> Any:
+        self.requests.append((method, args))
+        answer = self.handlers[method]
+        if callable(answer):
+            answer = answer(*args)
+        if isinstance(answer, BaseException):
+            raise answer
+        return answer
+
+    def calls(self, method: str) -> list[tuple]:
+        return [args for name, args in self.requests if name == method]
+
+    @property
+    async def chain_id(self) -> int:
+        return await self._answer("chain_id")
+
+    @property
+    async def gas_price(self) -> int:
+        return await self._answer("gas_price")
+
+    @property
+    async def block_number(self) -> int:
+        return await self._answer("block_number")
+
+    async def call(self, tx: dict, *args: Any) -> bytes:
+        return await self._answer("call", tx)
+
+    async def estimate_gas(self, tx: dict, *args: Any) -> int:
+        return await self._answer("estimate_gas", tx)
+
+    async def fee_history(self, blocks: int, newest: str, percentiles: list[int]) -> dict:
+        return await self._answer("fee_history", blocks, newest, percentiles)
+
+    async def get_transaction_count(self, address: str, block: str = "latest") -> int:
+        return await self._answer("get_transaction_count", address, block)
+
+    async def get_transaction(self, tx_hash: bytes) -> dict:
+        return await self._answer("get_transaction", tx_hash)
+
+    async def get_transaction_receipt(self, tx_hash: bytes) -> dict:
+        return await self._answer("get_transaction_receipt", tx_hash)
+
+    async def get_balance(self, address: str, block: int | str = "latest") -> int:
+        return await self._answer("get_balance", address, block)
+
+    async def get_logs(self, params: dict) -> list:
+        return await self._answer("get_logs", params)
+
+    async def send_raw_transaction(self, raw_tx: bytes) -> bytes:
+        return await self._answer("send_raw_transaction", raw_tx)
+
+
+class FakeWeb3:
+    to_hex = staticmethod(Web3.to_hex)
+    to_checksum_address = staticmethod(Web3.to_checksum_address)
+
+    def __init__(self) -> None:
+        self.provider = object()
+        self.eth = FakeEth()
+
+
+def sequence(*answers: Any):
+    # Handler giving one answer per call, the last one repeats
+    answers = list(answers)
+    return lambda *args: answers.pop(0) if len(answers) > 1 else answers[0]
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class StubNode:
+    # Local JSON-RPC server. `handlers` maps a method to a value or a function of its params,
+    # RpcError becomes a JSON-RPC error and any other exception an HTTP 500.
+    def __init__(self) -> None:
+        self.handlers: dict[str, Any] = {"eth_blockNumber": "0x10", "eth_chainId": "0x144"}
+        self.requests: list[str] = []
+        self.posts: list[int] = []
+        self.batch_error: dict | None = None
+        self.port = 0
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _answer(self, request: dict) -> dict:
+        self.requests.append(request["method"])
+        answer = self.handlers[request["method"]]
+        try:
+            result = answer(request["params"]) if callable(answer) else answer
+        except RpcError as ex:
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": ex.code, "message": ex.message}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        self.posts.append(len(payload) if isinstance(payload, list) else 1)
+        if isinstance(payload, list) and self.batch_error is not None:
+            return web.json_response(self.batch_error)
+        if isinstance(payload, list):
+            # Answered out of order, clients have to match responses by id
+            return web.Response(text=json.dumps([self._answer(item) for item in reversed(payload)]))
+        return web.Response(text=json.dumps(self._answer(payload)))
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+@asynccontextmanager
+async def stub_nodes(count: int):
+    nodes = [StubNode() for _ in range(count)]
+    try:
+        for node in nodes:
+            await node.start()
+        yield nodes
+    finally:
+        for node in nodes:
+            await node.stop()
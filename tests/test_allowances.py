@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+
+from eth_abi import encode
+
+from utils import helper
+from utils.allowances import INFINITE_ALLOWANCE, AllowanceLedger
+
+PRIVATE_KEY = "0x" + "11" * 32
+USDC = "0x3355df6D4c9C3035724Fd0e3914dE96A5a83aaf4"
+ROUTER = "0x2da10A1e27bF85cEdD8FFb1AbBe97e53391C0295"
+
+
+def test_concurrent_swaps_send_one_approval(web3, monkeypatch):
+    web3.eth.handlers["call"] = encode(["uint256"], [0])
+    ledger = AllowanceLedger()
+    approvals = []
+
+    async def get_token_contract(web3, token_ca):
+        approve = lambda spender, amount: SimpleNamespace(fn_name="approve", args=(spender, amount))
+        return SimpleNamespace(functions=SimpleNamespace(approve=approve))
+
+    async def submit(intent):
+        approvals.append(intent.call.args)
+        await asyncio.sleep(0.01)
+        intent.tx_hash, intent.receipt = "0x01", {"status": 1}
+        return intent
+
+    monkeypatch.setattr(helper, "allowance_ledger", ledger)
+    monkeypatch.setattr(helper, "get_token_contract", get_token_contract)
+    monkeypatch.setattr(helper.tx_engine, "submit", submit)
+
+    async def main():
+        return await asyncio.gather(*[
+            helper.approve_token(10 ** 6, PRIVATE_KEY, "zksync", USDC, "USDC", ROUTER, web3) for _ in range(3)
+        ])
+
+    assert asyncio.run(main()) == ["0x01", None, None]
+    assert approvals == [(ROUTER, helper.INFINITE_APPROVAL)]
+    # The allowance is read once, the waiting swaps see the recorded infinite approval
+    assert len(web3.eth.calls("call")) == 1
+
+
+def test_finite_allowance_is_read_again(web3):
+    web3.eth.handlers["call"] = encode(["uint256"], [5])
+    ledger = AllowanceLedger()
+    wallet = helper.get_wallet_address_from_private_key(web3, PRIVATE_KEY)
+
+    async def main():
+        first = await ledger.get(web3, wallet, USDC, ROUTER)
+        web3.eth.handlers["call"] = encode(["uint256"], [INFINITE_ALLOWANCE])
+        return first, await ledger.get(web3, wallet, USDC, ROUTER), await ledger.get(web3, wallet, USDC, ROUTER)
+
+    assert asyncio.run(main()) == (5, INFINITE_ALLOWANCE, INFINITE_ALLOWANCE)
+    assert len(web3.eth.calls("call")) == 2
@@ -0,0 +1,68 @@
+import asyncio
+
+from utils import provider
+from utils.provider import PooledHTTPProvider
+
+ADDRESSES = [f"0x{i:040x}" for i in range(1, 8)]
+
+
+def balance_of(params):
+    return hex(int(params[0], 16) * 100)
+
+
+async def balances(node, addresses):
+    rpc = PooledHTTPProvider(node.url)
+    try:
+        return await asyncio.gather(
+            *[rpc.make_request("eth_getBalance", [address, "latest"]) for address in addresses],
+            return_exceptions=True
+        )
+    finally:
+        await rpc.disconnect()
+
+
+def test_batched_responses_are_matched_by_id(rpc_nodes):
+    async def main():
+        async with rpc_nodes(1) as (node,):
+            node.handlers["eth_getBalance"] = balance_of
+            return node.posts, await balances(node, ADDRESSES)
+
+    posts, responses = asyncio.run(main())
+    assert posts == [len(ADDRESSES)]
+    assert [response["result"] for response in responses] == [balance_of([address]) for address in ADDRESSES]
+
+
+def test_batch_is_flushed_at_max_batch_size(rpc_nodes, monkeypatch):
+    monkeypatch.setitem(provider._pool_settings, "max_batch_size", 3)
+
+    async def main():
+        async with rpc_nodes(1) as (node,):
+            node.handlers["eth_getBalance"] = balance_of
+            return node.posts, await balances(node, ADDRESSES)
+
+    posts, responses = asyncio.run(main())
+    assert posts == [3, 3, 1]
+    assert [response["result"] for response in responses] == [balance_of([address]) for address in ADDRESSES]
+
+
+def test_rejected_batch_falls_back_to_single_requests(rpc_nodes):
+    async def main():
+        async with rpc_nodes(1) as (node,):
+            node.handlers["eth_getBalance"] = balance_of
+            node.batch_error = {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "batch not supported"}}
+            return node.posts, await balances(node, ADDRESSES[:3])
+
+    posts, responses = asyncio.run(main())
+    assert posts == [3, 1, 1, 1]
+    assert [response["result"] for response in responses] == [balance_of([address]) for address in ADDRESSES[:3]]
+
+
+def test_failed_post_fails_every_queued_request(rpc_nodes):
+    async def main():
+        async with rpc_nodes(1) as (node,):
+            await node.stop()
+            return await balances(node, ADDRESSES[:3])
+
+    responses = asyncio.run(main())
+    assert len(responses) == 3
+    assert all(isinstance(response, Exception) for response in responses)
@@ -0,0 +1,37 @@
+import asyncio
+
+from utils.fees import FeeOracle
+
+HISTORY = {"baseFeePerGas": [100, 120], "reward": [[1, 2, 3]] * 5}
+
+
+def test_transient_fee_history_error_is_retried(web3, answers):
+    web3.eth.handlers["fee_history"] = answers(
+        asyncio.TimeoutError(),
+        ValueError({"code": 429, "message": "Too many requests"}),
+        HISTORY
+    )
+    web3.eth.handlers["gas_price"] = 250
+    oracle = FeeOracle()
+
+    async def main():
+        return [await oracle._fetch(web3) for _ in range(3)]
+
+    legacy, limited, history = asyncio.run(main())
+    assert legacy == limited == (250, {25: 0, 50: 0, 75: 0})
+    assert history == (120, {25: 1, 50: 2, 75: 3})
+    assert web3.provider not in oracle._no_fee_history
+
+
+def test_missing_fee_history_falls_back_for_good(web3):
+    web3.eth.handlers["fee_history"] = ValueError(
+        {"code": -32601, "message": "the method eth_feeHistory does not exist/is not available"}
+    )
+    web3.eth.handlers["gas_price"] = 250
+    oracle = FeeOracle()
+
+    async def main():
+        return [await oracle._fetch(web3) for _ in range(2)]
+
+    assert asyncio.run(main()) == [(250, {25: 0, 50: 0, 75: 0})] * 2
+    assert len(web3.eth.calls("fee_history")) == 1
@@ -0,0 +1,50 @@
+import asyncio
+
+from utils.gas import GasLimitCache
+
+TX = {"to": "0x2da10A1e27bF85cEdD8FFb1AbBe97e53391C0295", "data": "0x2cc4081e" + "00" * 32, "value": 0}
+
+
+def test_receipts_never_seed_a_template(web3):
+    web3.eth.handlers["estimate_gas"] = 400_000
+    cache = GasLimitCache()
+    cache.observe_receipt(web3, TX, {"status": 1, "gasUsed": 150_000})
+
+    assert asyncio.run(cache.estimate(web3, TX)) == 400_000
+    assert len(web3.eth.calls("estimate_gas")) == 1
+
+
+def test_receipts_only_raise_a_fresh_template(web3):
+    web3.eth.handlers["estimate_gas"] = 400_000
+    cache = GasLimitCache(safety_margin=1)
+
+    async def main():
+        await cache.estimate(web3, TX)
+        cache.observe_receipt(web3, TX, {"status": 1, "gasUsed": 150_000})
+        lowered = await cache.estimate(web3, TX)
+        cache.observe_receipt(web3, TX, {"status": 1, "gasUsed": 450_000})
+        return lowered, await cache.estimate(web3, TX)
+
+    assert asyncio.run(main()) == (400_000, 450_000)
+
+
+def test_stale_template_is_not_refreshed_by_a_receipt(web3):
+    web3.eth.handlers["estimate_gas"] = 400_000
+    cache = GasLimitCache(max_age=60)
+    asyncio.run(cache.estimate(web3, TX))
+    key = cache.key(web3, TX)
+    cache._limits[key] = (400_000, cache._limits[key][1] - 120)
+
+    cache.observe_receipt(web3, TX, {"status": 1, "gasUsed": 150_000})
+    assert cache._limits[key][0] == 400_000
+    asyncio.run(cache.estimate(web3, TX))
+    assert len(web3.eth.calls("estimate_gas")) == 2
+
+
+def test_revert_drops_the_template(web3):
+    web3.eth.handlers["estimate_gas"] = 400_000
+    cache = GasLimitCache()
+    asyncio.run(cache.estimate(web3, TX))
+    cache.observe_receipt(web3, TX, {"status": 0, "gasUsed": 400_000})
+
+    assert cache._limits == {}
@@ -0,0 +1,44 @@
+import asyncio
+
+from utils import inch
+from utils.inch import INCH_NATIVE_ADDRESS, InchClient
+
+API_URL = "https://api.1inch.test/v5.0/324"
+WETH = "0x5AEa5775959fBC2557Cc8789bC1bf90A239D9a91"
+USDC = "0x3355df6D4c9C3035724Fd0e3914dE96A5a83aaf4"
+
+
+def test_eth_is_sent_to_1inch_as_the_native_coin(monkeypatch, tmp_path):
+    requests = []
+
+    async def get_json(url, params=None, **kwargs):
+        requests.append((url, params))
+        if url.endswith("/quote"):
+            return {"toTokenAmount": "1600000000"}
+        return {"toTokenAmount": "1600000000", "tx": {"to": USDC, "data": "0x", "value": "1", "gasPrice": "1"}}
+
+    monkeypatch.setattr(inch.http_client, "get_json", get_json)
+    client = InchClient(cache_file=tmp_path / "inch.json")
+
+    async def main():
+        await client.get_quote(API_URL, WETH, USDC, 10 ** 18)
+        await client.get_swap(API_URL, WETH, USDC, 10 ** 18, USDC, 1)
+        await client.get_quote(API_URL, USDC, WETH, 10 ** 6)
+
+    asyncio.run(main())
+    assert [params["fromTokenAddress"] for _, params in requests] == [INCH_NATIVE_ADDRESS, INCH_NATIVE_ADDRESS, USDC]
+    assert [params["toTokenAddress"] for _, params in requests] == [USDC, USDC, INCH_NATIVE_ADDRESS]
+
+
+def test_zero_amount_is_quoted_as_zero_without_a_request(monkeypatch, tmp_path):
+    requests = []
+
+    async def get_json(url, params=None, **kwargs):
+        requests.append(url)
+        return {"toTokenAmount": "1"}
+
+    monkeypatch.setattr(inch.http_client, "get_json", get_json)
+    client = InchClient(cache_file=tmp_path / "inch.json")
+
+    assert asyncio.run(client.get_quote(API_URL, USDC, WETH, 0)) == {"toTokenAmount": "0"}
+    assert requests == []
@@ -0,0 +1,19 @@
+import asyncio
+
+from utils.nonce import NonceManager
+
+WALLET = "0x1111111111111111111111111111111111111111"
+
+
+def test_failed_nonce_is_reused_unless_the_node_rejected_it(web3, answers):
+    web3.eth.handlers["get_transaction_count"] = answers(5, 9)
+    manager = NonceManager()
+
+    async def main():
+        nonce = await manager.reserve(web3, WALLET)
+        await manager.release_failed(web3, WALLET, nonce, ValueError("execution reverted"))
+        reused = await manager.reserve(web3, WALLET)
+        await manager.release_failed(web3, WALLET, reused, ValueError({"message": "nonce too low"}))
+        return nonce, reused, await manager.reserve(web3, WALLET)
+
+    assert asyncio.run(main()) == (5, 5, 9)
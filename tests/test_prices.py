@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+from utils import prices
+from utils.prices import PriceCache
+
+TICKERS = {"ETHUSDT": "1600.5", "USDCUSDT": "1.0001"}
+
+
+def install(monkeypatch, responses):
+    requests = []
+
+    async def get_json(url, params=None, raise_for_status=True):
+        pairs = json.loads(params["symbols"])
+        requests.append(pairs)
+        response = responses.pop(0) if responses else None
+        if response is not None:
+            return response
+        if any(pair not in TICKERS for pair in pairs):
+            return {"code": -1121, "msg": "Invalid symbol."}
+        return [{"symbol": pair, "price": TICKERS[pair]} for pair in pairs]
+
+    monkeypatch.setattr(prices.http_client, "get_json", get_json)
+    return requests
+
+
+def test_rate_limit_does_not_blacklist_symbols(monkeypatch):
+    install(monkeypatch, [{"code": -1003, "msg": "Too many requests; current limit is 6000 request weight per 1 MINUTE."}])
+    cache = PriceCache()
+
+    async def main():
+        await cache.prefetch(["ETH", "USDC", "USDT"])
+        return await cache.get_prices(["ETH", "USDC", "USDT"])
+
+    assert asyncio.run(main()) == {"ETH": 1600.5, "USDC": 1.0001, "USDT": 1.0}
+    assert cache._invalid == set()
+
+
+def test_unknown_symbol_is_isolated(monkeypatch):
+    install(monkeypatch, [])
+    cache = PriceCache()
+
+    async def main():
+        return await cache.get_prices(["ETH", "USDC", "NOPE"])
+
+    assert asyncio.run(main()) == {"ETH": 1600.5, "USDC": 1.0001}
+    assert cache._invalid == {"NOPE"}
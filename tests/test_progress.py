@@ -0,0 +1,120 @@
+import asyncio
+from types import SimpleNamespace
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+from utils import progress
+from utils.progress import ProgressStore
+
+WALLET = "0x1111111111111111111111111111111111111111"
+TX_HASH = "0x" + "ab" * 32
+
+
+class Crash(Exception):
+    pass
+
+
+def test_tx_row_survives_a_crash_before_the_batched_flush(monkeypatch, tmp_path):
+    path = tmp_path / "progress.db"
+    store = ProgressStore(flush_interval=60)
+    store.open(path)
+    monkeypatch.setattr(progress, "progress_store", store)
+    intent = SimpleNamespace(
+        web3=Web3(),
+        address=WALLET,
+        nonce=7,
+        call=None,
+        signed_tx=SimpleNamespace(hash=HexBytes(TX_HASH))
+    )
+
+    async def swap():
+        await progress.checkpoint_stage(intent)
+        raise Crash()
+
+    async def main():
+        try:
+            await store.run_step(None, WALLET, "swaps.0.usdc_to_usdt", swap)
+        except Crash:
+            pass
+
+    asyncio.run(main())
+    # The process dies here, nothing batched is ever flushed
+    store._db.close()
+
+    restored = ProgressStore()
+    restored.open(path)
+    assert restored.get_step(WALLET, "swaps.0.usdc_to_usdt") == "started"
+    assert restored.step_txs(WALLET, "swaps.0.usdc_to_usdt") == [
+        {"tx_hash": TX_HASH, "wallet": WALLET, "step": "swaps.0.usdc_to_usdt", "nonce": 7, "status": "sent"}
+    ]
+    assert restored.get_nonce(WALLET) == 8
+
+
+def test_restart_after_the_mint_only_bridges(monkeypatch, tmp_path, web3):
+    path = tmp_path / "progress.db"
+    store = ProgressStore(flush_interval=60)
+    store.open(path)
+    monkeypatch.setattr(progress, "progress_store", store)
+    web3.eth.handlers["block_number"] = 16
+    web3.eth.handlers["get_transaction_receipt"] = {"status": 1, "transactionHash": HexBytes(TX_HASH)}
+    intent = SimpleNamespace(
+        web3=Web3(),
+        address=WALLET,
+        nonce=7,
+        call=None,
+        signed_tx=SimpleNamespace(hash=HexBytes(TX_HASH))
+    )
+
+    async def mint():
+        await progress.checkpoint_stage(intent)
+        raise Crash()
+
+    async def first_run():
+        try:
+            await store.run_step(web3, WALLET, "extras.mint", mint)
+        except Crash:
+            pass
+
+    asyncio.run(first_run())
+    store._db.close()
+
+    restored = ProgressStore()
+    restored.open(path)
+    actions = []
+
+    async def second_run():
+        async def mint_again():
+            actions.append("mint")
+            return True
+
+        async def bridge():
+            actions.append(("bridge", restored.last_tx(WALLET, "extras.mint")))
+            return True
+
+        await restored.run_step(web3, WALLET, "extras.mint", mint_again)
+        await restored.run_step(web3, WALLET, "extras.bridge", bridge)
+        await restored.close()
+
+    asyncio.run(second_run())
+    assert actions == [("bridge", TX_HASH)]
+    assert restored.get_step(WALLET, "extras.mint") == "done"
+
+
+def test_step_with_nothing_to_send_is_done(tmp_path):
+    store = ProgressStore()
+    store.open(tmp_path / "progress.db")
+    calls = []
+
+    async def nothing_to_swap():
+        calls.append(1)
+        return True
+
+    async def main():
+        await store.run_step(None, WALLET, "extras.withdraw_usdt", nothing_to_swap)
+        await store.run_step(None, WALLET, "extras.withdraw_usdt", nothing_to_swap)
+        await store.close()
+
+    asyncio.run(main())
+    assert calls == [1]
+    assert store.get_step(WALLET, "extras.withdraw_usdt") == "done"
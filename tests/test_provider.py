@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from utils import provider
+from utils.provider import BREAKER_FAILURES, LoadBalancedProvider, shared_task, wallet_affinity
+
+from fakes import RpcError
+
+WALLET = "0x1111111111111111111111111111111111111111"
+TX_HASH = "0x" + "ab" * 32
+
+
+@pytest.fixture(autouse=True)
+def short_cooldown(monkeypatch):
+    monkeypatch.setattr(provider, "BREAKER_COOLDOWN", 0.05)
+
+
+async def pinned_to_first(nodes, method, params=()):
+    # Sends one request as WALLET with the first node as its pinned endpoint
+    lb = LoadBalancedProvider([node.url for node in nodes])
+    try:
+        with wallet_affinity(WALLET):
+            lb._sticky[WALLET] = lb.endpoints[0]
+            return lb, await lb.make_request(method, list(params))
+    finally:
+        await lb.disconnect()
+
+
+def test_dead_endpoint_fails_over_is_ejected_probed_and_readmitted(rpc_nodes):
+    async def main():
+        async with rpc_nodes(2) as (a_node, b_node):
+            lb = LoadBalancedProvider([a_node.url, b_node.url])
+            a, b = lb.endpoints
+            try:
+                with wallet_affinity(WALLET):
+                    lb._sticky[WALLET] = a
+                    await a_node.stop()
+                    for _ in range(BREAKER_FAILURES):
+                        assert (await lb.make_request("eth_blockNumber", []))["result"] == "0x10"
+                    assert not a.available
+
+                    # Ejected, the wallet moves to the other endpoint without trying the dead one again
+                    assert (await lb.make_request("eth_blockNumber", []))["result"] == "0x10"
+                    assert a.failures == BREAKER_FAILURES
+                    assert lb._sticky[WALLET] is b
+
+                    await a_node.start()
+                    await asyncio.sleep(0.1)
+                    # The next request schedules a probe of the endpoint whose cooldown ran out
+                    await lb.make_request("eth_blockNumber", [])
+                    await asyncio.gather(*lb._probes)
+                assert a.available
+                assert a_node.requests == ["eth_blockNumber"]
+                assert lb._choose(None, {b.uri}) is a
+            finally:
+                await lb.disconnect()
+
+    asyncio.run(main())
+
+
+def test_send_is_not_retried_after_a_transport_error(rpc_nodes):
+    def accepted_then_failed(params):
+        raise ConnectionResetError("node went away")
+
+    async def main():
+        async with rpc_nodes(2) as (a_node, b_node):
+            a_node.handlers["eth_sendRawTransaction"] = accepted_then_failed
+            b_node.handlers["eth_sendRawTransaction"] = TX_HASH
+            with pytest.raises(Exception):
+                await pinned_to_first([a_node, b_node], "eth_sendRawTransaction", ["0x01"])
+            return a_node.requests, b_node.requests
+
+    a_requests, b_requests = asyncio.run(main())
+    assert a_requests == ["eth_sendRawTransaction"]
+    assert b_requests == []
+
+
+def test_node_errors_count_against_the_endpoint(rpc_nodes):
+    def internal_error(params):
+        raise RpcError(-32603, "internal error")
+
+    async def main():
+        async with rpc_nodes(2) as (a_node, b_node):
+            a_node.handlers["eth_call"] = internal_error
+            b_node.handlers["eth_call"] = "0x"
+            lb, response = await pinned_to_first([a_node, b_node], "eth_call", [{}, "latest"])
+            return lb.endpoints[0], response, b_node.requests
+
+    a, response, b_requests = asyncio.run(main())
+    assert response["result"] == "0x"
+    assert a.error_rate > 0
+    assert b_requests == ["eth_call"]
+
+
+def test_reverts_do_not_count_against_the_endpoint(rpc_nodes):
+    def reverted(params):
+        raise RpcError(3, "execution reverted")
+
+    async def main():
+        async with rpc_nodes(2) as (a_node, b_node):
+            a_node.handlers["eth_call"] = reverted
+            lb, response = await pinned_to_first([a_node, b_node], "eth_call", [{}, "latest"])
+            return lb.endpoints[0], response, b_node.requests
+
+    a, response, b_requests = asyncio.run(main())
+    assert response["error"] == {"code": 3, "message": "execution reverted"}
+    assert a.error_rate == 0
+    assert b_requests == []
+
+
+def test_shared_tasks_are_not_pinned_to_a_wallet():
+    async def affinity():
+        return provider._wallet_affinity.get()
+
+    async def main():
+        with wallet_affinity(WALLET):
+            return await shared_task(affinity()), await asyncio.ensure_future(affinity())
+
+    assert asyncio.run(main()) == (None, WALLET)
@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+from web3 import Web3
+
+from utils import quotes
+from utils.quotes import QuoteError, get_amount_out, get_amounts_out, get_mute_pool
+
+WETH = Web3.to_checksum_address("0x5aea5775959fbc2557cc8789bc1bf90a239d9a91")
+USDC = Web3.to_checksum_address("0x3355df6d4c9c3035724fd0e3914de96a5a83aaf4")
+PAIR = Web3.to_checksum_address("0x" + "77" * 20)
+
+
+def pool(dex: str, stable: bool, fee: int, reserve_in: int, reserve_out: int, decimals_in: int = 18,
+         decimals_out: int = 18) -> dict:
+    return {
+        "dex": dex,
+        "pool": PAIR,
+        "stable": stable,
+        "fee": fee,
+        "reserve_in": reserve_in,
+        "reserve_out": reserve_out,
+        "decimals_in": decimals_in,
+        "decimals_out": decimals_out
+    }
+
+
+def constant_product(amount_in: int, reserve_in: int, reserve_out: int, fee: float) -> int:
+    amount_in_with_fee = amount_in * (1 - fee)
+    return int(amount_in_with_fee * reserve_out / (reserve_in + amount_in_with_fee))
+
+
+@pytest.mark.parametrize("amount_in", [1, 10 ** 6, 10 ** 15, 5 * 10 ** 18])
+def test_sync_swap_classic_matches_constant_product(amount_in):
+    # 1000 ETH against 1.6M USDC, 0.3% fee in SyncSwap's 1e5 precision
+    classic = pool("syncswap", False, 300, 1000 * 10 ** 18, 1_600_000 * 10 ** 6, 18, 6)
+    expected = constant_product(amount_in, classic["reserve_in"], classic["reserve_out"], 0.003)
+    assert abs(get_amount_out(classic, amount_in) - expected) <= 1
+
+
+def test_sync_swap_stable_is_near_parity_on_a_balanced_pool():
+    # 1M USDC / 1M USDT, 0.01% fee
+    stable = pool("syncswap", True, 10, 10 ** 12, 10 ** 12, 6, 6)
+    amount_out = get_amount_out(stable, 10 ** 6)
+    assert 999_800 < amount_out <= 999_900
+
+
+def test_sync_swap_stable_keeps_the_invariant():
+    stable = pool("syncswap", True, 0, 10 ** 12, 8 * 10 ** 11, 6, 6)
+    amount_in = 10 ** 10
+    amount_out = get_amount_out(stable, amount_in)
+    multiplier = 10 ** 12
+    d_before = quotes._stable_d(stable["reserve_in"] * multiplier, stable["reserve_out"] * multiplier)
+    d_after = quotes._stable_d(
+        (stable["reserve_in"] + amount_in) * multiplier,
+        (stable["reserve_out"] - amount_out) * multiplier
+    )
+    # Rounding only ever favours the pool
+    assert d_after >= d_before
+    assert (d_after - d_before) / d_before < 1e-9
+
+
+@pytest.mark.parametrize("amount_in", [1, 10 ** 6, 10 ** 15, 5 * 10 ** 18])
+def test_mute_volatile_matches_constant_product(amount_in):
+    # Mute fees are in 1e4 precision, 30 is 0.3%
+    volatile = pool("mute", False, 30, 1000 * 10 ** 18, 1_600_000 * 10 ** 6, 18, 6)
+    expected = constant_product(amount_in, volatile["reserve_in"], volatile["reserve_out"], 0.003)
+    assert abs(get_amount_out(volatile, amount_in) - expected) <= 1
+
+
+def test_mute_stable_is_near_parity_on_a_balanced_pool():
+    stable = pool("mute", True, 1, 10 ** 12, 10 ** 12, 6, 6)
+    amount_out = get_amount_out(stable, 10 ** 6)
+    assert 999_800 < amount_out <= 999_900
+
+
+def test_mute_stable_keeps_the_invariant():
+    stable = pool("mute", True, 0, 10 ** 24, 9 * 10 ** 23)
+    amount_in = 10 ** 21
+    amount_out = get_amount_out(stable, amount_in)
+    k_before = quotes._solidly_k(stable["reserve_in"], stable["reserve_out"])
+    k_after = quotes._solidly_k(stable["reserve_in"] + amount_in, stable["reserve_out"] - amount_out)
+    assert k_after >= k_before
+    assert (k_after - k_before) / k_before < 1e-9
+
+
+@pytest.mark.parametrize("dex,stable", [("syncswap", False), ("syncswap", True), ("mute", False), ("mute", True)])
+def test_amount_out_grows_with_amount_in_and_stays_below_reserves(dex, stable):
+    curve = pool(dex, stable, 10, 10 ** 12, 10 ** 12, 6, 6)
+    amounts_out = get_amounts_out(curve, [0, 10 ** 3, 10 ** 6, 10 ** 9, 10 ** 11, 10 ** 14])
+    assert amounts_out[0] == 0
+    assert amounts_out == sorted(amounts_out)
+    assert amounts_out[-1] < curve["reserve_out"]
+
+
+def test_unknown_dex_is_rejected():
+    with pytest.raises(QuoteError):
+        get_amount_out(pool("uniswap", False, 0, 10, 10), 1)
+
+
+class FakeCall:
+    def __init__(self, result):
+        self.result = result
+
+    async def call(self):
+        return self.result
+
+
+class FakeRouter:
+    # Mute's getPairInfo answers with the pair's sorted tokens and the reserves in that order
+    def __init__(self, reserves: dict[str, int]):
+        self.reserves = reserves
+        self.functions = self
+
+    def getPairInfo(self, tokens, stable):
+        token_a, token_b = sorted(tokens, key=lambda token: int(token, 16))
+        return FakeCall((token_a, token_b, PAIR, self.reserves[token_a], self.reserves[token_b], 30))
+
+
+@pytest.fixture
+def mute_router(monkeypatch):
+    router = FakeRouter({WETH: 1000 * 10 ** 18, USDC: 1_600_000 * 10 ** 6})
+    decimals = {WETH: 18, USDC: 6}
+
+    async def get_contract(address, web3, abi_name):
+        return router
+
+    async def get_token(web3, token_ca):
+        return {"decimals": decimals[token_ca]}
+
+    monkeypatch.setattr(quotes, "get_contract", get_contract)
+    monkeypatch.setattr(quotes.token_registry, "get", get_token)
+    return router
+
+
+@pytest.mark.parametrize("token_in,token_out", [(WETH, USDC), (USDC, WETH)])
+def test_get_mute_pool_orders_reserves_by_input_token(mute_router, token_in, token_out):
+    mute_pool = asyncio.run(get_mute_pool(None, PAIR, token_in.lower(), token_out))
+    assert mute_pool["reserve_in"] == mute_router.reserves[token_in]
+    assert mute_pool["reserve_out"] == mute_router.reserves[token_out]
+    assert mute_pool["decimals_in"] == (18 if token_in == WETH else 6)
+
+
+def test_get_mute_pool_quotes_eth_to_usdc_at_the_pool_price(mute_router):
+    # WETH sorts after USDC, so the router hands back the USDC reserve first
+    mute_pool = asyncio.run(get_mute_pool(None, PAIR, WETH, USDC))
+    amount_out = get_amount_out(mute_pool, 10 ** 18)
+    assert 1590 * 10 ** 6 < amount_out < 1600 * 10 ** 6
+
+
+def test_get_mute_pool_rejects_an_empty_pair(mute_router):
+    mute_router.reserves[USDC] = 0
+    with pytest.raises(QuoteError):
+        asyncio.run(get_mute_pool(None, PAIR, WETH, USDC))
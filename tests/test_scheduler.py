@@ -0,0 +1,26 @@
+import asyncio
+
+from utils.scheduler import FleetScheduler
+
+
+def test_exit_fails_one_wallet_and_in_flight_counts_running_jobs():
+    scheduler = FleetScheduler(max_in_flight=4)
+    seen = []
+
+    async def quits():
+        exit()
+
+    async def ok():
+        await asyncio.sleep(0)
+        seen.append(scheduler.progress()["in_flight"])
+        return True
+
+    scheduler.submit("a", quits)
+    scheduler.submit("b", ok)
+    results = asyncio.run(scheduler.run())
+
+    assert results["b"] is True
+    assert isinstance(results["a"], SystemExit)
+    assert scheduler.failed == 1
+    assert seen == [1]
+    assert scheduler.progress()["in_flight"] == 0
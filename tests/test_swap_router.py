@@ -0,0 +1,59 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import utils
+from modules import swap_router
+from modules.swap_router import SwapRouter
+
+WETH = "0x5AEa5775959fBC2557Cc8789bC1bf90A239D9a91"
+USDC = "0x3355df6D4c9C3035724Fd0e3914dE96A5a83aaf4"
+ROUTER = "0x2da10A1e27bF85cEdD8FFb1AbBe97e53391C0295"
+POOL = "0x80115c708E12eDd42E504c1cD52Aea96C547c05c"
+
+
+@pytest.fixture
+def sync_router(web3, monkeypatch):
+    built = []
+
+    async def build_sync_swap(router, pool_address, from_token_address, from_token_symbol, amount_wei, amount_out_min):
+        built.append((from_token_address, from_token_symbol))
+        return SimpleNamespace(fn_name="swap", args=())
+
+    async def get_contract(address, web3, abi_name):
+        return SimpleNamespace(address=ROUTER, encodeABI=lambda fn_name, args: "0x2cc4081e")
+
+    async def get_sync_swap_pool(*args):
+        return {"pool": POOL}
+
+    swapper = SimpleNamespace(
+        web3=web3,
+        tokens={"ETH": WETH, "USDC": USDC},
+        address_wallet="0x1111111111111111111111111111111111111111",
+        build_sync_swap=build_sync_swap
+    )
+    monkeypatch.setattr(utils, "get_contract", get_contract)
+    monkeypatch.setattr(utils, "get_sync_swap_pool", get_sync_swap_pool)
+    monkeypatch.setattr(utils, "get_amount_out", lambda pool, amount_in: amount_in * 2)
+    monkeypatch.setattr(swap_router, "_sync_pool_addresses", {(web3.provider, WETH, USDC): POOL, (web3.provider, USDC, WETH): POOL})
+    monkeypatch.setattr(swap_router, "_quote_gas", utils.GasLimitCache())
+    web3.eth.handlers["estimate_gas"] = 300_000
+    return SwapRouter(swapper, "0x8B791913eB07C32779a16750e3868aA8495F5964", "https://api.1inch.test"), built
+
+
+@pytest.mark.parametrize("token_in,token_out,symbol", [(WETH, USDC, "ETH"), (USDC, WETH, "USDC")])
+def test_sync_quote_builds_the_swap_with_the_token_symbol(sync_router, token_in, token_out, symbol):
+    router, built = sync_router
+    assert asyncio.run(router._quote_sync(token_in, token_out, 10)) == (20, 300_000)
+    assert built == [(token_in, symbol)]
+
+
+def test_quote_estimates_stay_out_of_the_engine_gas_cache(sync_router, monkeypatch):
+    router, _ = sync_router
+    engine_cache = utils.GasLimitCache()
+    monkeypatch.setattr(utils, "gas_limit_cache", engine_cache)
+
+    asyncio.run(router._quote_sync(WETH, USDC, 10))
+    assert engine_cache._limits == {}
+    assert len(swap_router._quote_gas._limits) == 1
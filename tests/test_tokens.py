@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from eth_abi import encode
+
+from utils.tokens import DECIMALS_SELECTOR, TOKENS_CACHE_VERSION, TokenRegistry
+
+WETH = "0x5AEa5775959fBC2557Cc8789bC1bf90A239D9a91"
+USDC = "0x3355df6D4c9C3035724Fd0e3914dE96A5a83aaf4"
+DECIMALS = {WETH: 18, USDC: 6}
+
+
+def token_calls(web3):
+    def call(tx):
+        if tx["data"] == DECIMALS_SELECTOR:
+            return encode(["uint8"], [DECIMALS[tx["to"]]])
+        return encode(["string"], ["TKN"])
+
+    web3.eth.handlers["chain_id"] = 324
+    web3.eth.handlers["call"] = call
+    return web3
+
+
+def entry(address, symbol, decimals):
+    return {"address": address, "chain_id": 324, "symbol": symbol, "decimals": decimals}
+
+
+def test_disk_entries_are_rechecked_once_and_config_wins(web3, tmp_path):
+    cache_file = tmp_path / "tokens.json"
+    cache_file.write_text(json.dumps({
+        "version": TOKENS_CACHE_VERSION,
+        "chains": {"324": {WETH: entry(WETH, "USDC", 6), USDC: entry(USDC, "USDC", 6)}}
+    }))
+    registry = TokenRegistry(cache_file)
+    registry.seed({"ETH": WETH, "USDC": USDC}, 324)
+    token_calls(web3)
+
+    async def main():
+        first = await registry.get(web3, WETH)
+        calls = len(web3.eth.calls("call"))
+        await registry.get(web3, WETH)
+        await registry.get(web3, USDC)
+        return first, calls
+
+    token, calls = asyncio.run(main())
+    assert token == entry(WETH, "ETH", 18)
+    # Both seeded tokens are checked in the first batch and never again
+    assert len(web3.eth.calls("call")) == calls
+    assert json.loads(cache_file.read_text())["chains"]["324"][WETH]["decimals"] == 18
+
+
+def test_outdated_cache_file_is_ignored(tmp_path):
+    cache_file = tmp_path / "tokens.json"
+    cache_file.write_text(json.dumps({"324": {WETH: entry(WETH, "ETH", 6)}}))
+    registry = TokenRegistry(cache_file)
+
+    assert registry._tokens == {}
+
+
+def test_clear_drops_cached_entries(web3, tmp_path):
+    cache_file = tmp_path / "tokens.json"
+    registry = TokenRegistry(cache_file)
+    registry.seed({"ETH": WETH}, 324)
+    asyncio.run(registry.resolve(token_calls(web3), [WETH]))
+
+    registry.clear(324)
+    assert registry._tokens == {}
+    assert TokenRegistry(cache_file)._tokens == {}
@@ -0,0 +1,74 @@
+import asyncio
+
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+
+from utils.transfers import TRANSFER_TOPIC, TransferWatcher
+
+USDC = "0x3355df6D4c9C3035724Fd0e3914dE96A5a83aaf4"
+USDT = "0x493257fD37EDB34451f62EDf8D2a0C418852bA4C"
+ALICE = "0x1111111111111111111111111111111111111111"
+BOB = "0x2222222222222222222222222222222222222222"
+POOL = "0x3333333333333333333333333333333333333333"
+
+
+def transfer(index, block_number, token, sender, recipient, amount):
+    return {
+        "address": token,
+        "blockNumber": block_number,
+        "logIndex": index,
+        "transactionHash": HexBytes(bytes([index]) * 32),
+        "topics": [HexBytes(TRANSFER_TOPIC), HexBytes(encode(["address"], [sender])), HexBytes(encode(["address"], [recipient]))],
+        "data": HexBytes(encode(["uint256"], [amount]))
+    }
+
+
+LOGS = [
+    transfer(0, 10, USDC, POOL, ALICE, 7),  # At the block the balance was read, already counted
+    transfer(1, 11, USDC, ALICE, POOL, 100),
+    transfer(2, 11, USDT, POOL, ALICE, 99),  # Other token
+    transfer(3, 11, USDC, POOL, BOB, 50),
+]
+
+
+def get_logs(params):
+    # Mimics the node's topic filter: the sender query sets topic 1, the recipient query topic 2
+    sender_topics, recipient_topics = (params["topics"][1:] + [None])[:2]
+    return [
+        log for log in LOGS
+        if params["fromBlock"] <= log["blockNumber"] <= params["toBlock"]
+        and log["address"] in params["address"]
+        and (sender_topics is None or Web3.to_hex(log["topics"][1]) in sender_topics)
+        and (recipient_topics is None or Web3.to_hex(log["topics"][2]) in recipient_topics)
+    ]
+
+
+def test_fleet_waits_share_one_log_query_per_block(web3, answers):
+    web3.eth.handlers["block_number"] = answers(10, 11)
+    web3.eth.handlers["get_logs"] = get_logs
+    watcher = TransferWatcher()
+
+    async def main():
+        return await asyncio.gather(
+            watcher.wait(web3, ALICE, USDC, 1000, 10),
+            watcher.wait(web3, BOB, USDC, 0, 10)
+        )
+
+    assert asyncio.run(main()) == [900, 50]
+    # One block with transfers, one query for transfers out and one for transfers in, for both wallets
+    assert len(web3.eth.calls("get_logs")) == 2
+
+
+def test_wait_times_out_without_a_transfer(web3):
+    web3.eth.handlers["block_number"] = 10
+    web3.eth.handlers["get_logs"] = []
+    watcher = TransferWatcher()
+
+    async def main():
+        try:
+            await watcher.wait(web3, ALICE, USDC, 1000, 10, timeout=0.3)
+        except Exception as ex:
+            return type(ex).__name__
+
+    assert asyncio.run(main()) == "TimeExhausted"
@@ -0,0 +1,90 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from hexbytes import HexBytes
+from web3.exceptions import TransactionNotFound
+
+from utils.nonce import nonce_manager
+from utils.signer import get_address
+from utils.tx_engine import TxEngine, TxIntent, broadcast_stage, nonce_stage
+
+WALLET = "0x1111111111111111111111111111111111111111"
+PRIVATE_KEY = "0x" + "11" * 32
+TX_HASH = "0x" + "ab" * 32
+
+
+def signed_intent(web3):
+    return SimpleNamespace(
+        web3=web3,
+        address=WALLET,
+        nonce=3,
+        signed_tx=SimpleNamespace(rawTransaction=b"\x01", hash=HexBytes(TX_HASH)),
+        tx_hash=None
+    )
+
+
+@pytest.mark.parametrize("error", ["already known", "nonce too low"])
+def test_resent_transaction_counts_as_submitted(web3, error):
+    web3.eth.handlers["send_raw_transaction"] = ValueError({"code": -32000, "message": error})
+    web3.eth.handlers["get_transaction"] = {"hash": HexBytes(TX_HASH)}
+    intent = signed_intent(web3)
+
+    asyncio.run(broadcast_stage(intent))
+    assert intent.tx_hash == TX_HASH
+
+
+def test_nonce_taken_by_another_transaction_still_fails(web3):
+    web3.eth.handlers["send_raw_transaction"] = ValueError({"code": -32000, "message": "nonce too low"})
+    web3.eth.handlers["get_transaction"] = TransactionNotFound("unknown")
+    intent = signed_intent(web3)
+
+    with pytest.raises(ValueError):
+        asyncio.run(broadcast_stage(intent))
+    assert intent.tx_hash is None
+
+
+def test_other_send_errors_are_not_looked_up(web3):
+    web3.eth.handlers["send_raw_transaction"] = ValueError({"code": -32000, "message": "insufficient funds"})
+    intent = signed_intent(web3)
+
+    with pytest.raises(ValueError):
+        asyncio.run(broadcast_stage(intent))
+    assert web3.eth.calls("get_transaction") == []
+
+
+
+def recorded(name, order, error=None):
+    async def stage(intent):
+        order.append(name)
+        if error is not None:
+            raise error
+    return stage
+
+
+def test_stages_run_in_order_with_added_and_replaced_ones(web3):
+    order = []
+    engine = TxEngine([(name, recorded(name, order)) for name in ("nonce", "build", "sign", "broadcast")])
+    engine.add_stage("checkpoint", recorded("checkpoint", order), after="sign")
+    engine.replace_stage("build", recorded("build v2", order))
+
+    asyncio.run(engine.submit(TxIntent(web3, PRIVATE_KEY)))
+    assert order == ["nonce", "build v2", "sign", "checkpoint", "broadcast"]
+    assert list(engine.report()) == ["nonce", "build", "sign", "checkpoint", "broadcast"]
+
+
+@pytest.mark.parametrize("error,next_nonce,count_reads", [
+    (ValueError({"code": 3, "message": "execution reverted"}), 5, 1),
+    (ValueError({"code": -32000, "message": "nonce too low"}), 9, 2)
+])
+def test_nonce_released_before_broadcast_is_reused_or_resynced(web3, answers, error, next_nonce, count_reads):
+    web3.eth.handlers["get_transaction_count"] = answers(5, 9)
+    engine = TxEngine([("nonce", nonce_stage), ("gas", recorded("gas", [], error))])
+
+    async def main():
+        with pytest.raises(ValueError):
+            await engine.submit(TxIntent(web3, PRIVATE_KEY))
+        return await nonce_manager.reserve(web3, get_address(PRIVATE_KEY))
+
+    assert asyncio.run(main()) == next_nonce
+    assert len(web3.eth.calls("get_transaction_count")) == count_reads
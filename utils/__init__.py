@@ -1 +1,20 @@
 from .helper import *
+from .confirm import *
+from .tokens import *
+from .provider import *
+from .fees import *
+from .gas import *
+from .http import *
+from .inch import *
+from .prices import *
+from .nonce import *
+from .signer import *
+from .multicall import *
+from .tx_engine import *
+from .ratelimit import *
+from .scheduler import *
+from .pools import *
+from .quotes import *
+from .allowances import *
+from .transfers import *
+from .progress import *
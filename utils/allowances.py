@@ -0,0 +1,82 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from eth_abi import decode, encode
+from web3 import AsyncWeb3, Web3
+
+ALLOWANCE_SELECTOR = "0xdd62ed3e"
+# Anything this large is an "infinite" approval that swaps will never use up
+INFINITE_ALLOWANCE = 2 ** 128
+
+
+class AllowanceLedger:
+    def __init__(self) -> None:
+        self._infinite: set[tuple] = set()
+        self._pending: set[tuple] = set()
+        self._locks: dict[tuple, asyncio.Lock] = {}
+
+    @staticmethod
+    def _key(web3: AsyncWeb3, wallet: str, token: str, spender: str) -> tuple:
+        return (
+            web3.provider,
+            Web3.to_checksum_address(wallet),
+            Web3.to_checksum_address(token),
+            Web3.to_checksum_address(spender)
+        )
+
+    def _lock(self, key: tuple) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    def record(self, web3: AsyncWeb3, wallet: str, token: str, spender: str, allowance: int) -> None:
+        # Only infinite allowances are remembered, finite ones shrink with every swap and are read again
+        key = self._key(web3, wallet, token, spender)
+        if allowance >= INFINITE_ALLOWANCE:
+            self._infinite.add(key)
+        else:
+            self._infinite.discard(key)
+
+    def forget(self, web3: AsyncWeb3, wallet: str, token: str, spender: str) -> None:
+        self._infinite.discard(self._key(web3, wallet, token, spender))
+
+    def is_pending(self, web3: AsyncWeb3, wallet: str, token: str, spender: str) -> bool:
+        return self._key(web3, wallet, token, spender) in self._pending
+
+    async def get(self, web3: AsyncWeb3, wallet: str, token: str, spender: str) -> int:
+        key = self._key(web3, wallet, token, spender)
+        if key in self._infinite:
+            return INFINITE_ALLOWANCE
+        raw = await web3.eth.call({
+            "to": key[2],
+            "data": ALLOWANCE_SELECTOR + encode(["address", "address"], [key[1], key[3]]).hex()
+        })
+        allowance = decode(["uint256"], raw)[0]
+        self.record(web3, wallet, token, spender, allowance)
+        return allowance
+
+    @asynccontextmanager
+    async def approving(self, web3: AsyncWeb3, wallet: str, token: str, spender: str) -> AsyncIterator[int]:
+        # Holds the (wallet, token, spender) slot while an approval is decided and mined, so concurrent
+        # actions wait for it and then see the new allowance instead of sending a second approval
+        key = self._key(web3, wallet, token, spender)
+        async with self._lock(key):
+            self._pending.add(key)
+            try:
+                yield await self.get(web3, wallet, token, spender)
+            finally:
+                self._pending.discard(key)
+
+    async def preload(self, web3: AsyncWeb3, wallets: list[str], tokens: list[str], spender: str) -> None:
+        from .multicall import get_fleet_allowances
+
+        table = await get_fleet_allowances(web3, wallets, tokens, spender)
+        for wallet, row in table.items():
+            for token, allowance in row.items():
+                if allowance is not None:
+                    self.record(web3, wallet, token, spender, allowance)
+
+
+allowance_ledger = AllowanceLedger()
@@ -0,0 +1,143 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from hexbytes import HexBytes
+from web3 import AsyncWeb3
+from web3.exceptions import TimeExhausted, TransactionNotFound
+from web3.types import TxReceipt
+
+from .provider import shared_task
+
+DEFAULT_TIMEOUT = 120
+MIN_POLL_INTERVAL = 0.25
+MAX_POLL_INTERVAL = 3
+POLL_BACKOFF = 1.5
+BLOCK_NUMBER_MAX_AGE = 0.25
+
+_block_numbers: dict = {}
+_block_number_requests: dict = {}
+
+
+async def get_block_number(web3: AsyncWeb3, max_age: float = BLOCK_NUMBER_MAX_AGE) -> int:
+    # One eth_blockNumber per provider and max_age window, shared by every waiter
+    loop = asyncio.get_running_loop()
+    cached = _block_numbers.get(web3.provider)
+    if cached is not None and loop.time() - cached[1] <= max_age:
+        return cached[0]
+
+    request = _block_number_requests.get(web3.provider)
+    if request is None or request.get_loop() is not loop:
+        request = _block_number_requests[web3.provider] = shared_task(web3.eth.block_number)
+        request.add_done_callback(lambda _: _block_number_requests.pop(web3.provider, None))
+    block_number = await asyncio.shield(request)
+    _block_numbers[web3.provider] = (block_number, loop.time())
+    return block_number
+
+
+async def wait_for_block(web3: AsyncWeb3, block_number: int, timeout: float = DEFAULT_TIMEOUT) -> int:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = MIN_POLL_INTERVAL
+    while True:
+        current = await get_block_number(web3)
+        if current >= block_number:
+            return current
+        if loop.time() >= deadline:
+            raise TimeExhausted(f"Block {block_number} not reached after {timeout} seconds, at {current}")
+        await asyncio.sleep(min(delay, max(deadline - loop.time(), 0)))
+        delay = min(delay * POLL_BACKOFF, MAX_POLL_INTERVAL)
+
+
+class ReceiptWatcher:
+    def __init__(self) -> None:
+        # provider -> {tx hash: (receipt future, deadline)}
+        self._pending: dict = {}
+        self._tasks: dict = {}
+
+    def watch(self, web3: AsyncWeb3, tx_hash: str | bytes, timeout: float = DEFAULT_TIMEOUT) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        tx_hash = HexBytes(tx_hash)
+        pending = self._pending.setdefault(web3.provider, {})
+        watched = pending.get(tx_hash)
+        if watched is None or watched[0].get_loop() is not loop:
+            watched = (loop.create_future(), loop.time() + timeout)
+        else:
+            watched = (watched[0], max(watched[1], loop.time() + timeout))
+        pending[tx_hash] = watched
+
+        task = self._tasks.get(web3.provider)
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._tasks[web3.provider] = shared_task(self._run(web3, pending))
+        return watched[0]
+
+    async def _poll(self, web3: AsyncWeb3, pending: dict) -> None:
+        # Every watched hash is asked in the same tick, so they leave as one JSON-RPC batch
+        loop = asyncio.get_running_loop()
+        tx_hashes = list(pending)
+        receipts = await asyncio.gather(
+            *[web3.eth.get_transaction_receipt(tx_hash) for tx_hash in tx_hashes],
+            return_exceptions=True
+        )
+        for tx_hash, receipt in zip(tx_hashes, receipts):
+            future, deadline = pending[tx_hash]
+            if isinstance(receipt, TransactionNotFound):
+                if loop.time() < deadline:
+                    continue
+                receipt = TimeExhausted(f"Transaction {tx_hash.hex()} is not in the chain after the timeout")
+            del pending[tx_hash]
+            if future.done():
+                continue
+            if isinstance(receipt, BaseException):
+                future.set_exception(receipt)
+            else:
+                future.set_result(receipt)
+
+    async def _run(self, web3: AsyncWeb3, pending: dict) -> None:
+        # Polls all pending receipts once right away and then once per new block until none are left
+        loop = asyncio.get_running_loop()
+        try:
+            block_number = await get_block_number(web3)
+            while pending:
+                await self._poll(web3, pending)
+                if not pending:
+                    break
+                remaining = max(deadline for _, deadline in pending.values()) - loop.time()
+                try:
+                    block_number = await wait_for_block(web3, block_number + 1, max(remaining, 0))
+                except TimeExhausted:
+                    pass
+        except Exception as ex:
+            for future, _ in pending.values():
+                if not future.done():
+                    future.set_exception(ex)
+            pending.clear()
+
+    async def wait(self, web3: AsyncWeb3, tx_hash: str | bytes, timeout: float = DEFAULT_TIMEOUT) -> TxReceipt:
+        return await asyncio.shield(self.watch(web3, tx_hash, timeout))
+
+
+receipt_watcher = ReceiptWatcher()
+
+
+async def wait_for_transaction(web3: AsyncWeb3, tx_hash: str | bytes, timeout: float = DEFAULT_TIMEOUT) -> TxReceipt:
+    return await receipt_watcher.wait(web3, tx_hash, timeout)
+
+
+async def wait_for_change(
+        web3: AsyncWeb3,
+        read: Callable[[], Awaitable[Any]],
+        initial: Any,
+        timeout: float = DEFAULT_TIMEOUT
+) -> Any:
+    # Re-reads the value only when a new block shows up, returns the first value that differs
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    block_number = await get_block_number(web3)
+    while True:
+        value = await read()
+        if value != initial:
+            return value
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise TimeExhausted(f"Value did not change from {initial} after {timeout} seconds")
+        block_number = await wait_for_block(web3, block_number + 1, remaining)
@@ -0,0 +1,100 @@
+import asyncio
+import statistics
+
+from loguru import logger
+from web3 import AsyncWeb3
+
+from .confirm import get_block_number
+from .provider import shared_task
+
+FEE_STRATEGIES = {
+    "slow": {"base_fee_multiplier": 1.1, "reward_percentile": 25},
+    "normal": {"base_fee_multiplier": 1.25, "reward_percentile": 50},
+    "fast": {"base_fee_multiplier": 2, "reward_percentile": 75},
+}
+
+# JSON-RPC "method not found", the node does not serve eth_feeHistory at all
+METHOD_NOT_FOUND = -32601
+METHOD_NOT_SUPPORTED_ERRORS = (
+    "method not found",
+    "not supported",
+    "does not exist",
+    "not available"
+)
+
+
+def is_method_not_supported(ex: Exception) -> bool:
+    error = ex.args[0] if ex.args else None
+    if isinstance(error, dict) and error.get("code") == METHOD_NOT_FOUND:
+        return True
+    message = str(ex).lower()
+    return any(error in message for error in METHOD_NOT_SUPPORTED_ERRORS)
+
+
+class FeeOracle:
+    def __init__(self, strategy: str = "normal", history_blocks: int = 5) -> None:
+        self.strategy = strategy
+        self.history_blocks = history_blocks
+        self._fees: dict = {}
+        self._requests: dict = {}
+        self._no_fee_history: set = set()
+
+    def configure(self, strategy: str | None = None, history_blocks: int | None = None) -> None:
+        if strategy is not None:
+            if strategy not in FEE_STRATEGIES:
+                raise ValueError(f"Unknown fee strategy {strategy}, expected one of {list(FEE_STRATEGIES)}")
+            self.strategy = strategy
+        if history_blocks is not None:
+            self.history_blocks = history_blocks
+
+    async def _fetch(self, web3: AsyncWeb3) -> tuple[int, dict[int, int]]:
+        percentiles = sorted({strategy["reward_percentile"] for strategy in FEE_STRATEGIES.values()})
+        if web3.provider not in self._no_fee_history:
+            try:
+                history = await web3.eth.fee_history(self.history_blocks, "latest", percentiles)
+                rewards = history.get("reward") or []
+                return history["baseFeePerGas"][-1], {
+                    percentile: int(statistics.median(block[i] for block in rewards)) if rewards else 0
+                    for i, percentile in enumerate(percentiles)
+                }
+            except Exception as ex:
+                if is_method_not_supported(ex):
+                    # Node without eth_feeHistory, fall back to the legacy gas price for good
+                    self._no_fee_history.add(web3.provider)
+                else:
+                    # Timeouts, rate limits and the like only cost this block, the next one asks again
+                    logger.warning(f'Fee history failed, using gas price for this block | {ex}')
+        return await web3.eth.gas_price, {percentile: 0 for percentile in percentiles}
+
+    async def get_block_fees(self, web3: AsyncWeb3) -> tuple[int, dict[int, int]]:
+        # Base fee and priority fee rewards, fetched at most once per block per provider
+        block_number = await get_block_number(web3)
+        cached = self._fees.get(web3.provider)
+        if cached is not None and cached[0] >= block_number:
+            return cached[1]
+
+        key = (web3.provider, block_number)
+        request = self._requests.get(key)
+        if request is None:
+            request = self._requests[key] = shared_task(self._fetch(web3))
+            request.add_done_callback(lambda _: self._requests.pop(key, None))
+        fees = await asyncio.shield(request)
+        cached = self._fees.get(web3.provider)
+        if cached is None or cached[0] < block_number:
+            self._fees[web3.provider] = (block_number, fees)
+        return fees
+
+    async def get_fees(self, web3: AsyncWeb3, strategy: str | None = None) -> dict[str, int]:
+        base_fee, rewards = await self.get_block_fees(web3)
+        strategy = FEE_STRATEGIES[strategy or self.strategy]
+        priority_fee = rewards[strategy["reward_percentile"]]
+        return {
+            'maxFeePerGas': int(base_fee * strategy["base_fee_multiplier"]) + priority_fee,
+            'maxPriorityFeePerGas': priority_fee
+        }
+
+    async def get_gas_price(self, web3: AsyncWeb3, strategy: str | None = None) -> int:
+        return (await self.get_fees(web3, strategy))['maxFeePerGas']
+
+
+fee_oracle = FeeOracle()
@@ -0,0 +1,62 @@
+import time
+
+from hexbytes import HexBytes
+from web3 import AsyncWeb3, Web3
+from web3.types import TxReceipt
+
+
+class GasLimitCache:
+    def __init__(self, safety_margin: float = 1.25, max_age: float = 600) -> None:
+        self.safety_margin = safety_margin
+        self.max_age = max_age
+        self._limits: dict[tuple, tuple[int, float]] = {}
+
+    @staticmethod
+    def key(web3: AsyncWeb3, tx: dict, token: str | None = None) -> tuple:
+        # Calls with the same target, selector, ETH-or-not value and input token cost about the same
+        data = HexBytes(tx.get('data') or tx.get('input') or b'')
+        return (
+            web3.provider,
+            Web3.to_checksum_address(tx['to']) if tx.get('to') else None,
+            data[:4].hex(),
+            not tx.get('value'),
+            Web3.to_checksum_address(token) if token else None
+        )
+
+    def _learn(self, key: tuple, gas: int) -> None:
+        cached = self._limits.get(key)
+        if cached is None or time.monotonic() - cached[1] > self.max_age:
+            self._limits[key] = (gas, time.monotonic())
+        else:
+            self._limits[key] = (max(gas, cached[0]), cached[1])
+
+    async def estimate(self, web3: AsyncWeb3, tx: dict, token: str | None = None, use_template: bool = True) -> int:
+        # Calls whose cost depends on more than the template (e.g. 1inch routes) are always estimated live
+        if not use_template:
+            return await web3.eth.estimate_gas(tx)
+
+        key = self.key(web3, tx, token)
+        cached = self._limits.get(key)
+        if cached is not None and time.monotonic() - cached[1] <= self.max_age:
+            return int(cached[0] * self.safety_margin)
+
+        gas_limit = await web3.eth.estimate_gas(tx)
+        self._learn(key, gas_limit)
+        return gas_limit
+
+    def observe_receipt(self, web3: AsyncWeb3, tx: dict, receipt: TxReceipt, token: str | None = None) -> None:
+        # gasUsed is measured after refunds and sits below the limit a call needs, so a receipt never
+        # creates or replaces a template. It only drops one that reverted or raises one still fresh.
+        key = self.key(web3, tx, token)
+        if receipt['status'] == 0:
+            self._limits.pop(key, None)
+            return
+        cached = self._limits.get(key)
+        if cached is not None and time.monotonic() - cached[1] <= self.max_age and receipt['gasUsed'] > cached[0]:
+            self._limits[key] = (receipt['gasUsed'], cached[1])
+
+    def invalidate(self, web3: AsyncWeb3, tx: dict, token: str | None = None) -> None:
+        self._limits.pop(self.key(web3, tx, token), None)
+
+
+gas_limit_cache = GasLimitCache()
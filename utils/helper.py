@@ -1,30 +1,47 @@
-from web3.contract import Contract
+from web3.contract import AsyncContract
 from eth_typing import HexStr
 import asyncio
 import random
 import json
 from hexbytes import HexBytes
 from loguru import logger
-from web3 import Web3
+from web3 import AsyncWeb3, Web3
+from web3.logs import DISCARD
 import os
 from pathlib import Path
 
+from .allowances import allowance_ledger
+from .confirm import wait_for_transaction
+from .fees import fee_oracle
+from .gas import gas_limit_cache
+from .tokens import token_registry
+from .tx_engine import TxIntent, tx_engine
+
 ABI_FOLDER = Path(__file__).resolve().parent
+NATIVE_ETH_ADDRESS = "0x5AEa5775959fBC2557Cc8789bC1bf90A239D9a91"
+# zkSync keeps ETH balances in this system contract, which emits ERC-20 Transfer logs for every ETH movement
+L2_ETH_TOKEN_ADDRESS = "0x000000000000000000000000000000000000800A"
+INFINITE_APPROVAL = 100000000000000000000000000000000000000000000000000000000000000000000000000000
+
+_abi_cache: dict[str, list] = {}
+_contract_factory_cache: dict[tuple, type[AsyncContract]] = {}
+_contract_cache: dict[tuple, AsyncContract] = {}
 
 
-def get_wallet_address_from_private_key(web3: Web3, private_key: str) -> str:
+def get_wallet_address_from_private_key(web3: AsyncWeb3, private_key: str) -> str:
     return web3.eth.account.from_key(private_key).address
 
 
-async def get_nft_id(web3: Web3, tx_hash: str) -> int:
-    logs = web3.eth.get_transaction_receipt(HexBytes(tx_hash)).logs
+def is_eth(token: str) -> bool:
+    return token.lower() in (NATIVE_ETH_ADDRESS.lower(), L2_ETH_TOKEN_ADDRESS.lower())
+
 
-    for log in logs:
-        if 'topics' in log and len(log['topics']) > 3:
-            topic = log['topics'][3]
-            if isinstance(topic, HexBytes):
-                nft_id = int(topic.hex(), 16)
-                return nft_id
+async def get_nft_id(web3: AsyncWeb3, tx_hash: str, contract: AsyncContract) -> int | None:
+    # The receipt watcher resolves as soon as the mint lands, the id comes from the ERC-721 Transfer it minted
+    receipt = await wait_for_transaction(web3, HexBytes(tx_hash))
+    for event in contract.events.Transfer().process_receipt(receipt, errors=DISCARD):
+        if event.address == contract.address and int(event.args['from'], 16) == 0:
+            return event.args['tokenId']
 
 
 async def setup_tokens_addresses(token1_symbol: str, token2_symbol: str, tokens: dict[str, str]) \
@@ -37,52 +54,79 @@ async def setup_tokens_addresses(token1_symbol: str, token2_symbol: str, tokens:
     return token1_address, token2_address
 
 
-async def get_token_decimals(web3: Web3, token_ca: str) -> int:
+async def get_token_decimals(web3: AsyncWeb3, token_ca: str) -> int:
     try:
-        token_contract = await get_token_contract(web3, token_ca)
-        decimals = token_contract.functions.decimals().call()
-        return decimals
+        token = await token_registry.get(web3, token_ca)
+        return token["decimals"]
 
     except Exception as ex:
         logger.error(f'Something went wrong | {ex}')
 
 
-async def amount_to_wei(web3: Web3, amount: float, token_ca: str) -> int:
+async def amount_to_wei(web3: AsyncWeb3, amount: float, token_ca: str) -> int:
     token_decimals = await get_token_decimals(web3, token_ca)
     return int(amount * (10 ** token_decimals))
 
 
-async def wei_to_amount(web3: Web3, wei_amount: int, token_ca: str) -> float:
+async def wei_to_amount(web3: AsyncWeb3, wei_amount: int, token_ca: str) -> float:
     token_decimals = await get_token_decimals(web3, token_ca)
     return wei_amount / (10 ** token_decimals)
 
 
-async def load_abi(name: str) -> str:
-    file_name = os.path.join(ABI_FOLDER, f'abis/{name}.json')
-    with open(file_name) as f:
-        abi: str = json.load(f)
+async def load_abi(name: str) -> list:
+    abi = _abi_cache.get(name)
+    if abi is None:
+        file_name = os.path.join(ABI_FOLDER, f'abis/{name}.json')
+        with open(file_name) as f:
+            abi = json.load(f)
+        _abi_cache[name] = abi
     return abi
 
 
-async def get_wallet_balance(web3: Web3, wallet_address: str, token_ca: str) -> float:
-    if token_ca != "0x5AEa5775959fBC2557Cc8789bC1bf90A239D9a91":
+def clear_contract_cache(abi_name: str | None = None) -> None:
+    if abi_name is None:
+        _abi_cache.clear()
+        _contract_factory_cache.clear()
+        _contract_cache.clear()
+        return
+
+    _abi_cache.pop(abi_name, None)
+    for cache in (_contract_factory_cache, _contract_cache):
+        for key in [key for key in cache if key[-1] == abi_name]:
+            del cache[key]
+
+
+async def get_wallet_balance(web3: AsyncWeb3, wallet_address: str, token_ca: str) -> float:
+    if token_ca != NATIVE_ETH_ADDRESS:
         wallet_address = web3.to_checksum_address(wallet_address)
         token_ca = web3.to_checksum_address(token_ca)
         token_contract = await get_token_contract(web3, token_ca)
-        balance_wei = token_contract.functions.balanceOf(wallet_address).call()
+        balance_call = token_contract.functions.balanceOf(wallet_address).call()
     else:
-        balance_wei = web3.eth.get_balance(Web3.to_checksum_address(wallet_address))
-    token_decimals = await get_token_decimals(web3, token_ca)
+        balance_call = web3.eth.get_balance(Web3.to_checksum_address(wallet_address))
+    balance_wei, token_decimals = await asyncio.gather(balance_call, get_token_decimals(web3, token_ca))
 
     return balance_wei / (10 ** token_decimals)
 
 
-async def get_contract(address, web3, abi_name) -> Contract:
-    address = web3.to_checksum_address(address)
-    return web3.eth.contract(address=address, abi=await load_abi(abi_name))
+async def get_contract(address, web3, abi_name) -> AsyncContract:
+    key = (web3.provider, address, abi_name)
+    contract = _contract_cache.get(key)
+    if contract is not None:
+        return contract
+
+    factory_key = (web3.provider, abi_name)
+    factory = _contract_factory_cache.get(factory_key)
+    if factory is None:
+        factory = web3.eth.contract(abi=await load_abi(abi_name))
+        _contract_factory_cache[factory_key] = factory
+
+    contract = factory(address=web3.to_checksum_address(address))
+    _contract_cache[key] = contract
+    return contract
 
 
-async def get_token_contract(web3: Web3, token_ca: str) -> Contract:
+async def get_token_contract(web3: AsyncWeb3, token_ca: str) -> AsyncContract:
     contract = await get_contract(token_ca, web3, "erc20")
     return contract
 
@@ -94,73 +138,59 @@ async def approve_token(
         from_token_address: str,
         from_token_symbol: str,
         spender: str,
-        web3: Web3
+        web3: AsyncWeb3
         ) -> HexStr:
     try:
         spender = web3.to_checksum_address(spender)
         address_wallet = get_wallet_address_from_private_key(web3, private_key)
         contract = await get_token_contract(web3, from_token_address)
-        allowance_amount = await check_allowance(web3, from_token_address, address_wallet, spender)
-        diff = amount - allowance_amount
-
-        if diff > 0:
-            tx = contract.functions.approve(
-                spender,
-                100000000000000000000000000000000000000000000000000000000000000000000000000000
-            ).build_transaction(
-                {
-                    'chainId': web3.eth.chain_id,
-                    'from': address_wallet,
-                    'nonce': web3.eth.get_transaction_count(web3.to_checksum_address(address_wallet)),
-                    'gasPrice': 0,
-                    'gas': 0,
-                    'value': 0
-                }
-            )
-            if chain == 'bsc':
-                tx['gasPrice'] = random.randint(1000000000, 1050000000)
-            else:
-                gas_price = await add_gas_price(web3)
-                tx['gasPrice'] = gas_price
-            tx['gas'] = await add_gas_limit(web3, tx)
-
-            signed_tx = web3.eth.account.sign_transaction(tx, private_key=private_key)
-            raw_tx_hash = web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-            tx_receipt = web3.eth.wait_for_transaction_receipt(raw_tx_hash)
-            while tx_receipt is None:
-                await asyncio.sleep(1)
-                tx_receipt = web3.eth.get_transaction_receipt(raw_tx_hash)
-            tx_hash = web3.to_hex(raw_tx_hash)
+        # Concurrent actions on the same (wallet, token, spender) wait here for a pending approval
+        async with allowance_ledger.approving(web3, address_wallet, from_token_address, spender) as allowance_amount:
+            diff = amount - allowance_amount
+            if diff <= 0:
+                return
+
+            # The engine takes EIP-1559 fees from the oracle unless a legacy price is forced
+            fees = {'gasPrice': random.randint(1000000000, 1050000000)} if chain == 'bsc' else None
+
+            intent = await tx_engine.submit(TxIntent(
+                web3,
+                private_key,
+                call=contract.functions.approve(spender, INFINITE_APPROVAL),
+                fees=fees,
+                wait=True
+            ))
+            tx_hash = intent.tx_hash
+            if intent.receipt is not None and intent.receipt["status"] == 1:
+                allowance_ledger.record(web3, address_wallet, from_token_address, spender, INFINITE_APPROVAL)
             logger.info(f'Infinity {from_token_symbol} approved for {address_wallet} wallet | Tx '
                         f'hash: {tx_hash}')
-            await asyncio.sleep(5)
             return tx_hash
 
     except Exception as ex:
         logger.error(f'Something went wrong | {ex}')
 
 
-async def check_allowance(web3: Web3, from_token_address: str, address_wallet: str, spender: str) -> float:
+async def check_allowance(web3: AsyncWeb3, from_token_address: str, address_wallet: str, spender: str) -> float:
     try:
-        contract = await get_token_contract(web3, from_token_address)
-        amount_approved = contract.functions.allowance(address_wallet, spender).call()
-        return amount_approved
+        # Infinite approvals already granted are answered from the ledger without a call
+        return await allowance_ledger.get(web3, address_wallet, from_token_address, spender)
 
     except Exception as ex:
         logger.error(f'Something went wrong | {ex}')
 
 
-async def add_gas_price(web3: Web3) -> int:
+async def add_gas_price(web3: AsyncWeb3) -> int:
     try:
-        gas_price = web3.eth.gas_price
+        gas_price = await fee_oracle.get_gas_price(web3)
         gas_price = int(gas_price * random.uniform(1.01, 1.02))
         return gas_price
     except Exception as ex:
         logger.error(f'Something went wrong | {ex}')
 
 
-async def add_gas_limit(web3: Web3, tx: dict) -> int:
+async def add_gas_limit(web3: AsyncWeb3, tx: dict) -> int:
     tx['value'] = 0
-    gas_limit = web3.eth.estimate_gas(tx)
+    gas_limit = await gas_limit_cache.estimate(web3, tx)
 
     return gas_limit
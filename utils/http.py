@@ -0,0 +1,86 @@
+import asyncio
+from typing import Any
+
+from aiohttp import ClientResponse, ClientSession, ClientTimeout, TCPConnector
+
+from .ratelimit import rate_limiter
+
+
+class HttpClient:
+    def __init__(
+            self,
+            limit: int = 100,
+            limit_per_host: int = 10,
+            dns_cache_ttl: int = 300,
+            timeout: float = 15
+    ) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = timeout
+        self._session: ClientSession | None = None
+        self._session_loop: asyncio.AbstractEventLoop | None = None
+
+    def configure(
+            self,
+            limit: int | None = None,
+            limit_per_host: int | None = None,
+            dns_cache_ttl: int | None = None,
+            timeout: float | None = None
+    ) -> None:
+        # Applies to the next session, call before the first request or after close().
+        if limit is not None:
+            self.limit = limit
+        if limit_per_host is not None:
+            self.limit_per_host = limit_per_host
+        if dns_cache_ttl is not None:
+            self.dns_cache_ttl = dns_cache_ttl
+        if timeout is not None:
+            self.timeout = timeout
+
+    async def get_session(self) -> ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl
+            )
+            self._session = ClientSession(
+                connector=connector,
+                timeout=ClientTimeout(total=self.timeout),
+                headers={"Accept-Encoding": "gzip, deflate"}
+            )
+            self._session_loop = loop
+        return self._session
+
+    @staticmethod
+    def _check_throttled(url: str, response: ClientResponse) -> None:
+        if response.status == 429:
+            rate_limiter.throttled(url, response.headers.get("Retry-After"))
+
+    async def get_json(self, url: str, params: dict | None = None, raise_for_status: bool = True) -> Any:
+        session = await self.get_session()
+        await rate_limiter.acquire(url)
+        async with session.get(url, params=params or {}) as response:
+            self._check_throttled(url, response)
+            if raise_for_status:
+                response.raise_for_status()
+            return await response.json()
+
+    async def post_json(self, url: str, json_data: Any, raise_for_status: bool = True) -> Any:
+        session = await self.get_session()
+        await rate_limiter.acquire(url)
+        async with session.post(url, json=json_data) as response:
+            self._check_throttled(url, response)
+            if raise_for_status:
+                response.raise_for_status()
+            return await response.json()
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+http_client = HttpClient()
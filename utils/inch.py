@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+from .helper import is_eth
+from .http import http_client
+
+INCH_CACHE_FILE = Path(__file__).resolve().parent / "cache" / "inch.json"
+# What 1inch calls the chain's native coin, the wallets hold ETH and not the wrapped token
+INCH_NATIVE_ADDRESS = "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE"
+
+
+def inch_token_address(token_address: str) -> str:
+    if is_eth(token_address):
+        return INCH_NATIVE_ADDRESS
+    return token_address
+
+
+def amount_bucket(amount_wei: int, significant_digits: int = 2) -> int:
+    # Amounts that agree on the leading digits share one quote
+    return int(float(f"{amount_wei:.{significant_digits - 1}e}"))
+
+
+class InchClient:
+    def __init__(self, cache_file: str | Path = INCH_CACHE_FILE, quote_ttl: float = 10, swap_ttl: float = 10) -> None:
+        self.cache_file = Path(cache_file)
+        self.quote_ttl = quote_ttl
+        self.swap_ttl = swap_ttl
+        self._spenders: dict[str, str] = {}
+        self._quotes: dict[tuple, tuple[float, asyncio.Future]] = {}
+        self._swaps: dict[tuple, tuple[float, asyncio.Future]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.cache_file) as f:
+                self._spenders.update(json.load(f).get("spenders", {}))
+        except (OSError, ValueError):
+            return
+
+    def _save(self) -> None:
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.cache_file.with_suffix(".tmp")
+        with open(tmp_file, "w") as f:
+            json.dump({"spenders": self._spenders}, f, indent=2)
+        os.replace(tmp_file, self.cache_file)
+
+    async def get_spender(self, api_url: str) -> str:
+        # The router address only changes with a new 1inch version, which comes with a new api_url
+        spender = self._spenders.get(api_url)
+        if spender is None:
+            response = await http_client.get_json(f'{api_url}/approve/spender')
+            spender = self._spenders[api_url] = response['address']
+            self._save()
+        return spender
+
+    @staticmethod
+    def _cached(cache: dict, key: tuple, ttl: float, request) -> asyncio.Future:
+        # Shares one in-flight or recent successful response per key, failed ones are asked again
+        cached = cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] <= ttl:
+            future = cached[1]
+            if not future.done() or future.exception() is None:
+                return future
+        if len(cache) > 1000:
+            now = time.monotonic()
+            for stale_key in [k for k, (created, _) in cache.items() if now - created > ttl]:
+                del cache[stale_key]
+        future = asyncio.ensure_future(request())
+        cache[key] = (time.monotonic(), future)
+        return future
+
+    async def get_quote(self, api_url: str, from_token_address: str, to_token_address: str, amount_wei: int) -> dict:
+        # Quotes the bucket amount and scales it, good enough to compare venues
+        if amount_wei <= 0:
+            # Nothing to sell, and no bucket to scale from
+            return {"toTokenAmount": "0"}
+        from_token_address, to_token_address = inch_token_address(from_token_address), inch_token_address(to_token_address)
+        bucket = amount_bucket(amount_wei)
+        key = (api_url, from_token_address.lower(), to_token_address.lower(), bucket)
+        response = await asyncio.shield(self._cached(self._quotes, key, self.quote_ttl, lambda: http_client.get_json(
+            f'{api_url}/quote',
+            {"fromTokenAddress": from_token_address, "toTokenAddress": to_token_address, "amount": bucket}
+        )))
+        to_amount = int(response.get("toTokenAmount") or response["toAmount"])
+        return {**response, "toTokenAmount": str(to_amount * amount_wei // bucket)}
+
+    async def get_swap(
+            self,
+            api_url: str,
+            from_token_address: str,
+            to_token_address: str,
+            amount_wei: int,
+            from_address: str,
+            slippage: float
+    ) -> dict:
+        # The tx is built for this wallet and this exact amount, so only repeats of the same request reuse it.
+        # The engine estimates this exact route live, so the call can go out before the approval is mined.
+        from_token_address, to_token_address = inch_token_address(from_token_address), inch_token_address(to_token_address)
+
+        async def request() -> dict:
+            response = await http_client.get_json(
+                f'{api_url}/swap',
+                {
+                    "fromTokenAddress": from_token_address,
+                    "toTokenAddress": to_token_address,
+                    "amount": amount_wei,
+                    "fromAddress": from_address,
+                    "slippage": slippage,
+                    "disableEstimate": "true"
+                },
+                raise_for_status=False
+            )
+            if 'tx' not in response:
+                raise ValueError(f"1inch /swap failed: {response.get('description') or response}")
+            return response
+
+        key = (api_url, from_token_address.lower(), to_token_address.lower(), amount_wei, from_address.lower(), slippage)
+        return await asyncio.shield(self._cached(self._swaps, key, self.swap_ttl, request))
+
+
+inch_client = InchClient()
@@ -0,0 +1,112 @@
+import asyncio
+
+from eth_abi import decode
+from web3 import AsyncWeb3, Web3
+
+from .helper import NATIVE_ETH_ADDRESS, get_contract, get_token_contract
+from .tokens import token_registry
+
+MULTICALL3_ADDRESS = "0xF9cda624FBC7e059355ce98a31693d299FACd963"
+MAX_CALLS_PER_CHUNK = 300
+MAX_CALLDATA_BYTES = 64_000
+
+# Rough ABI-encoded size of one Call3 tuple without its calldata
+_CALL3_OVERHEAD_BYTES = 160
+
+
+def _chunk_calls(calls: list[tuple[str, bytes]], max_calls: int, max_calldata: int) -> list[list[tuple[str, bytes]]]:
+    chunks, chunk, chunk_size = [], [], 0
+    for call in calls:
+        call_size = len(call[1]) + _CALL3_OVERHEAD_BYTES
+        if chunk and (len(chunk) >= max_calls or chunk_size + call_size > max_calldata):
+            chunks.append(chunk)
+            chunk, chunk_size = [], 0
+        chunk.append(call)
+        chunk_size += call_size
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+async def multicall(
+        web3: AsyncWeb3,
+        calls: list[tuple[str, bytes]],
+        multicall_address: str = MULTICALL3_ADDRESS,
+        max_calls: int = MAX_CALLS_PER_CHUNK,
+        max_calldata: int = MAX_CALLDATA_BYTES
+) -> list[bytes | None]:
+    # Runs (target, calldata) pairs through aggregate3, None marks a failed call
+    multicall_contract = await get_contract(multicall_address, web3, "multicall3")
+    chunks = _chunk_calls(calls, max_calls, max_calldata)
+    results = await asyncio.gather(*(
+        multicall_contract.functions.aggregate3(
+            [(target, True, call_data) for target, call_data in chunk]
+        ).call()
+        for chunk in chunks
+    ))
+    return [
+        return_data if success else None
+        for chunk_results in results
+        for success, return_data in chunk_results
+    ]
+
+
+async def get_fleet_balances(
+        web3: AsyncWeb3,
+        wallets: list[str],
+        tokens: list[str],
+        multicall_address: str = MULTICALL3_ADDRESS
+) -> dict[str, dict[str, float | None]]:
+    wallets = [Web3.to_checksum_address(wallet) for wallet in wallets]
+    tokens = [Web3.to_checksum_address(token) for token in tokens]
+    multicall_contract = await get_contract(multicall_address, web3, "multicall3")
+    await token_registry.resolve(web3, tokens)
+
+    calls = []
+    for wallet in wallets:
+        for token in tokens:
+            if token == NATIVE_ETH_ADDRESS:
+                calls.append((
+                    multicall_contract.address,
+                    multicall_contract.encodeABI(fn_name="getEthBalance", args=[wallet])
+                ))
+            else:
+                token_contract = await get_token_contract(web3, token)
+                calls.append((token, token_contract.encodeABI(fn_name="balanceOf", args=[wallet])))
+
+    results = iter(await multicall(web3, calls, multicall_address))
+    table = {}
+    for wallet in wallets:
+        row = table[wallet] = {}
+        for token in tokens:
+            return_data = next(results)
+            decimals = (await token_registry.get(web3, token))["decimals"]
+            row[token] = decode(["uint256"], return_data)[0] / (10 ** decimals) if return_data else None
+    return table
+
+
+async def get_fleet_allowances(
+        web3: AsyncWeb3,
+        wallets: list[str],
+        tokens: list[str],
+        spender: str,
+        multicall_address: str = MULTICALL3_ADDRESS
+) -> dict[str, dict[str, int | None]]:
+    wallets = [Web3.to_checksum_address(wallet) for wallet in wallets]
+    tokens = [Web3.to_checksum_address(token) for token in tokens]
+    spender = Web3.to_checksum_address(spender)
+
+    calls = []
+    for wallet in wallets:
+        for token in tokens:
+            token_contract = await get_token_contract(web3, token)
+            calls.append((token, token_contract.encodeABI(fn_name="allowance", args=[wallet, spender])))
+
+    results = iter(await multicall(web3, calls, multicall_address))
+    table = {}
+    for wallet in wallets:
+        row = table[wallet] = {}
+        for token in tokens:
+            return_data = next(results)
+            row[token] = decode(["uint256"], return_data)[0] if return_data else None
+    return table
@@ -0,0 +1,78 @@
+import asyncio
+
+from loguru import logger
+from web3 import AsyncWeb3, Web3
+
+NONCE_ERRORS = (
+    "nonce too low",
+    "nonce too high",
+    "already known",
+    "replacement transaction underpriced",
+    "invalid nonce"
+)
+
+
+def is_nonce_error(ex: Exception) -> bool:
+    message = str(ex).lower()
+    return any(error in message for error in NONCE_ERRORS)
+
+
+class NonceManager:
+    def __init__(self) -> None:
+        self._next: dict[tuple, int] = {}
+        self._reserved: dict[tuple, set[int]] = {}
+        self._stale: set[tuple] = set()
+        self._locks: dict[tuple, asyncio.Lock] = {}
+
+    @staticmethod
+    def _key(web3: AsyncWeb3, address: str) -> tuple:
+        return web3.provider, Web3.to_checksum_address(address)
+
+    def _lock(self, key: tuple) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    async def reserve(self, web3: AsyncWeb3, address: str) -> int:
+        key = self._key(web3, address)
+        async with self._lock(key):
+            reserved = self._reserved.setdefault(key, set())
+            if key not in self._next or (key in self._stale and not reserved):
+                self._next[key] = await web3.eth.get_transaction_count(key[1], "pending")
+                self._stale.discard(key)
+            nonce = self._next[key]
+            self._next[key] += 1
+            reserved.add(nonce)
+            return nonce
+
+    async def mark_sent(self, web3: AsyncWeb3, address: str, nonce: int) -> None:
+        key = self._key(web3, address)
+        async with self._lock(key):
+            self._reserved.get(key, set()).discard(nonce)
+
+    async def release(self, web3: AsyncWeb3, address: str, nonce: int, resync: bool = False) -> None:
+        # Gives back a nonce that never reached the node. Only the newest one can be
+        # reused in place, anything else leaves a gap and forces a resync from "pending".
+        key = self._key(web3, address)
+        async with self._lock(key):
+            self._reserved.get(key, set()).discard(nonce)
+            if not resync and self._next.get(key) == nonce + 1:
+                self._next[key] = nonce
+            else:
+                self._stale.add(key)
+
+    async def resync(self, web3: AsyncWeb3, address: str) -> None:
+        key = self._key(web3, address)
+        async with self._lock(key):
+            self._stale.add(key)
+
+    async def release_failed(self, web3: AsyncWeb3, address: str, nonce: int, ex: Exception) -> None:
+        # Releases the nonce of a transaction that failed before broadcast, resyncing if the node rejected it
+        resync = is_nonce_error(ex)
+        if resync:
+            logger.warning(f'Nonce {nonce} rejected for {address}, resyncing | {ex}')
+        await self.release(web3, address, nonce, resync=resync)
+
+
+nonce_manager = NonceManager()
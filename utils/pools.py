@@ -0,0 +1,201 @@
+import asyncio
+import time
+
+from eth_abi import decode
+from loguru import logger
+from web3 import AsyncWeb3, Web3
+
+from .confirm import get_block_number
+from .helper import get_contract
+from .http import http_client
+from .provider import shared_task
+from .tokens import token_registry
+
+SYNC_SWAP_POOLS_URL = "https://api.syncswap.xyz/api/fetchers/fetchAllPools"
+KYBER_SUBGRAPH_URL = "https://zksync-graph.kyberengineering.io/subgraphs/name/kybernetwork/kyberswap-exchange-zksync"
+
+GET_RESERVES_SELECTOR = "0x0902f1ac"
+
+KYBER_POOL_QUERY = """query pool($id: ID!) {
+  pool(id: $id, subgraphError: allow) {
+    id
+    token0 {
+      id
+      symbol
+      name
+      decimals
+    }
+    token1 {
+      id
+      symbol
+      name
+      decimals
+    }
+    amp
+    fee
+    reserve0
+    reserve1
+    vReserve0
+    vReserve1
+  }
+}
+"""
+
+
+def _pair_key(token_a: str, token_b: str) -> tuple[str, str]:
+    return tuple(sorted((token_a.lower(), token_b.lower())))
+
+
+class SyncSwapPoolIndex:
+    def __init__(self, ttl: float = 300, network: str = "zkSyncMainnet") -> None:
+        self.ttl = ttl
+        self.network = network
+        self._by_address: dict[str, dict] = {}
+        self._by_pair: dict[tuple[str, str], dict] = {}
+        self._updated = 0.0
+        self._refresh_task: asyncio.Task | None = None
+
+    def _add(self, pool: dict) -> None:
+        self._by_address[pool["pool"].lower()] = pool
+        self._by_pair[_pair_key(pool["token0"]["token"], pool["token1"]["token"])] = pool
+
+    async def _fetch(self) -> None:
+        try:
+            res_json = await http_client.get_json(SYNC_SWAP_POOLS_URL, {'network': self.network, 'quote': 'next'})
+            pools = res_json["pools"]
+            self._by_address, self._by_pair = {}, {}
+            for pool in pools:
+                self._add(pool)
+            self._updated = time.monotonic()
+        except Exception as ex:
+            logger.error(f'Something went wrong | {ex}')
+
+    def refresh(self) -> asyncio.Task:
+        # One snapshot download at a time, shared by every wallet waiting on it
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._fetch())
+        return self._refresh_task
+
+    async def _snapshot(self) -> None:
+        if not self._updated:
+            await asyncio.shield(self.refresh())
+        elif time.monotonic() - self._updated > self.ttl:
+            self.refresh()
+
+    async def _read_pool(self, web3: AsyncWeb3, pool_address: str) -> dict:
+        # Pool missing from the snapshot, build the same shape from the pool contract itself
+        pool_contract = await get_contract(pool_address, web3, "sync_swap_classic_pool")
+        token0, token1, (reserve0, reserve1) = await asyncio.gather(
+            pool_contract.functions.token0().call(),
+            pool_contract.functions.token1().call(),
+            pool_contract.functions.getReserves().call()
+        )
+        token0_data, token1_data = await asyncio.gather(
+            token_registry.get(web3, token0),
+            token_registry.get(web3, token1)
+        )
+        pool = {
+            "pool": Web3.to_checksum_address(pool_address),
+            "token0": {"token": token0, "symbol": token0_data["symbol"], "decimals": token0_data["decimals"]},
+            "token1": {"token": token1, "symbol": token1_data["symbol"], "decimals": token1_data["decimals"]},
+            "reserve0": str(reserve0),
+            "reserve1": str(reserve1)
+        }
+        self._add(pool)
+        return pool
+
+    async def get(self, web3: AsyncWeb3, pool_address: str) -> dict | None:
+        await self._snapshot()
+        pool = self._by_address.get(pool_address.lower())
+        if pool is not None:
+            return pool
+        try:
+            return await self._read_pool(web3, pool_address)
+        except Exception as ex:
+            logger.error(f'Something went wrong | {ex}')
+            return None
+
+    async def get_by_pair(self, token_a: str, token_b: str) -> dict | None:
+        await self._snapshot()
+        return self._by_pair.get(_pair_key(token_a, token_b))
+
+
+class KyberPoolIndex:
+    def __init__(self, url: str = KYBER_SUBGRAPH_URL) -> None:
+        self.url = url
+        self._pools: dict[str, dict] = {}
+        # In-flight subgraph lookups by pool id, and reserve reads by (provider, pool id, block number)
+        self._metadata_requests: dict[str, asyncio.Future] = {}
+        self._reserve_requests: dict[tuple, asyncio.Future] = {}
+        self._reserves: dict[tuple, tuple[int, tuple[str, str]]] = {}
+
+    async def _fetch(self, pool_id: str) -> dict | None:
+        res_json = await http_client.post_json(self.url, {
+            'operationName': 'pool',
+            'variables': {'id': pool_id},
+            'query': KYBER_POOL_QUERY
+        })
+        pool = res_json["data"]["pool"]
+        if pool is not None:
+            self._pools[pool_id] = pool
+        return pool
+
+    async def get_metadata(self, pool_address: str) -> dict | None:
+        # Tokens, amp and fee never change for a pool, so the subgraph is asked once per pool
+        pool_id = pool_address.lower()
+        pool = self._pools.get(pool_id)
+        if pool is not None:
+            return pool
+
+        request = self._metadata_requests.get(pool_id)
+        if request is None:
+            request = self._metadata_requests[pool_id] = asyncio.ensure_future(self._fetch(pool_id))
+            request.add_done_callback(lambda _: self._metadata_requests.pop(pool_id, None))
+        return await asyncio.shield(request)
+
+    async def _read_reserves(self, web3: AsyncWeb3, pool: dict) -> tuple[str, str]:
+        raw = await web3.eth.call({"to": Web3.to_checksum_address(pool["id"]), "data": GET_RESERVES_SELECTOR})
+        reserve0, reserve1 = decode(["uint256", "uint256"], raw[:64])
+        return (
+            str(reserve0 / 10 ** int(pool["token0"]["decimals"])),
+            str(reserve1 / 10 ** int(pool["token1"]["decimals"]))
+        )
+
+    async def get_reserves(self, web3: AsyncWeb3, pool: dict) -> tuple[str, str]:
+        # Reserves in token units like the subgraph reports them, read from the pool once per block
+        block_number = await get_block_number(web3)
+        cached = self._reserves.get((web3.provider, pool["id"]))
+        if cached is not None and cached[0] >= block_number:
+            return cached[1]
+
+        key = (web3.provider, pool["id"], block_number)
+        request = self._reserve_requests.get(key)
+        if request is None:
+            request = self._reserve_requests[key] = shared_task(self._read_reserves(web3, pool))
+            request.add_done_callback(lambda _: self._reserve_requests.pop(key, None))
+        reserves = await asyncio.shield(request)
+        cached = self._reserves.get((web3.provider, pool["id"]))
+        if cached is None or cached[0] < block_number:
+            self._reserves[(web3.provider, pool["id"])] = (block_number, reserves)
+        return reserves
+
+    async def get(self, web3: AsyncWeb3, pool_address: str) -> dict | None:
+        try:
+            pool = await self.get_metadata(pool_address)
+        except Exception as ex:
+            logger.error(f'Something went wrong | {ex}')
+            return None
+        if pool is None:
+            return None
+
+        try:
+            reserve0, reserve1 = await self.get_reserves(web3, pool)
+        except Exception as ex:
+            # Fall back to the reserves the subgraph returned with the metadata
+            logger.warning(f'Could not read reserves of {pool["id"]} on-chain, using subgraph values | {ex}')
+            return pool
+        return {**pool, "reserve0": reserve0, "reserve1": reserve1}
+
+
+sync_swap_pools = SyncSwapPoolIndex()
+kyber_pools = KyberPoolIndex()
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import time
+from typing import Iterable
+
+from loguru import logger
+
+from .http import http_client
+
+BINANCE_TICKER_URL = "https://api.binance.com/api/v3/ticker/price"
+BINANCE_INVALID_SYMBOL = -1121
+
+
+class PriceCache:
+    def __init__(self, ttl: float = 10, max_stale: float = 60, quote: str = "USDT", url: str = BINANCE_TICKER_URL) -> None:
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.quote = quote
+        self.url = url
+        self._prices: dict[str, tuple[float, float]] = {}
+        self._requests: dict[str, asyncio.Future] = {}
+        self._tracked: set[str] = set()
+        self._invalid: set[str] = set()
+        self._background: set[asyncio.Task] = set()
+
+    def configure(self, ttl: float | None = None, max_stale: float | None = None) -> None:
+        if ttl is not None:
+            self.ttl = ttl
+        if max_stale is not None:
+            self.max_stale = max(max_stale, self.ttl)
+
+    async def _request_prices(self, symbols: list[str]) -> dict[str, float]:
+        pairs = json.dumps([f"{symbol}{self.quote}" for symbol in symbols], separators=(",", ":"))
+        data = await http_client.get_json(self.url, {"symbols": pairs}, raise_for_status=False)
+        if isinstance(data, list):
+            return {item["symbol"][:-len(self.quote)]: float(item["price"]) for item in data if "price" in item}
+
+        # Rate limits, bans and outages come back as error objects too, those are retried on the next refresh
+        if not isinstance(data, dict) or data.get("code") != BINANCE_INVALID_SYMBOL:
+            raise ValueError(f"Binance price request failed: {data}")
+
+        # Binance rejects the whole list for one unknown pair, find it and never ask for it again
+        if len(symbols) == 1:
+            self._invalid.add(symbols[0])
+            return {}
+        prices = {}
+        for result in await asyncio.gather(*(self._request_prices([symbol]) for symbol in symbols)):
+            prices.update(result)
+        return prices
+
+    async def _fetch(self, symbols: list[str]) -> None:
+        try:
+            prices = {self.quote: 1.0} if self.quote in symbols else {}
+            pairs = [symbol for symbol in symbols if symbol != self.quote]
+            if pairs:
+                prices.update(await self._request_prices(pairs))
+            now = time.monotonic()
+            for symbol, price in prices.items():
+                self._prices[symbol] = (price, now)
+        except Exception as ex:
+            logger.error(f'Something went wrong | {ex}')
+
+    async def _refresh(self, symbols: set[str]) -> None:
+        # Symbols already being fetched join that request, the rest go out together with every
+        # tracked symbol in one call
+        waiting = {self._requests[symbol] for symbol in symbols if symbol in self._requests}
+        to_fetch = {symbol for symbol in symbols if symbol not in self._requests}
+        if to_fetch:
+            to_fetch |= {symbol for symbol in self._tracked - self._invalid if symbol not in self._requests}
+            request = asyncio.ensure_future(self._fetch(sorted(to_fetch)))
+            for symbol in to_fetch:
+                self._requests[symbol] = request
+
+            def done(_) -> None:
+                for symbol in to_fetch:
+                    if self._requests.get(symbol) is request:
+                        del self._requests[symbol]
+
+            request.add_done_callback(done)
+            waiting.add(request)
+        await asyncio.gather(*(asyncio.shield(request) for request in waiting))
+
+    async def prefetch(self, symbols: Iterable[str]) -> None:
+        symbols = {symbol.upper() for symbol in symbols}
+        self._tracked |= symbols
+        await self._refresh(symbols - self._invalid)
+
+    async def get_prices(self, symbols: Iterable[str]) -> dict[str, float]:
+        # Fresh prices are served from memory, stale ones too while a refresh runs in the background
+        symbols = {symbol.upper() for symbol in symbols} - self._invalid
+        now = time.monotonic()
+        missing, expired = set(), set()
+        for symbol in symbols:
+            cached = self._prices.get(symbol)
+            age = now - cached[1] if cached is not None else float("inf")
+            if age > self.max_stale:
+                missing.add(symbol)
+            elif age > self.ttl:
+                expired.add(symbol)
+
+        if missing:
+            await self._refresh(missing | expired)
+        elif expired:
+            task = asyncio.create_task(self._refresh(expired))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+        now = time.monotonic()
+        return {
+            symbol: self._prices[symbol][0]
+            for symbol in symbols
+            if symbol in self._prices and now - self._prices[symbol][1] <= self.max_stale
+        }
+
+    async def get_price(self, symbol: str) -> float | None:
+        return (await self.get_prices([symbol])).get(symbol.upper())
+
+
+price_cache = PriceCache()
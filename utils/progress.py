@@ -0,0 +1,313 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from hexbytes import HexBytes
+from loguru import logger
+from web3 import AsyncWeb3, Web3
+from web3.exceptions import TimeExhausted
+
+from .confirm import wait_for_transaction
+
+PROGRESS_DB_FILE = Path(__file__).resolve().parent / "cache" / "progress.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS steps (
+    wallet TEXT NOT NULL,
+    step TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (wallet, step)
+);
+CREATE TABLE IF NOT EXISTS txs (
+    tx_hash TEXT PRIMARY KEY,
+    wallet TEXT NOT NULL,
+    step TEXT,
+    nonce INTEGER,
+    status TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS wallets (
+    wallet TEXT PRIMARY KEY,
+    nonce INTEGER,
+    cycles INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS balances (
+    wallet TEXT NOT NULL,
+    token TEXT NOT NULL,
+    balance REAL NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (wallet, token)
+);
+"""
+
+# (wallet, step) of the checkpointed step running in this task, so the engine can tie its txs to it
+_current_step: ContextVar[tuple[str, str] | None] = ContextVar("current_step", default=None)
+
+
+class ProgressStore:
+    def __init__(self, flush_interval: float = 0.5, batch_size: int = 500) -> None:
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._db: sqlite3.Connection | None = None
+        self._steps: dict[tuple[str, str], str] = {}
+        self._txs: dict[str, dict] = {}
+        self._step_txs: dict[tuple[str, str], list[str]] = {}
+        self._in_flight: dict[str, set[str]] = {}
+        self._wallets: dict[str, dict] = {}
+        self._balances: dict[tuple[str, str], float] = {}
+        self._dirty: dict[str, dict] = {"steps": {}, "txs": {}, "wallets": {}, "balances": {}}
+        self._flush_task: asyncio.Task | None = None
+        self._flush_lock: asyncio.Lock | None = None
+        self._db_lock = threading.Lock()
+        self._background: set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    def open(self, path: str | Path = PROGRESS_DB_FILE, flush_interval: float | None = None) -> None:
+        if flush_interval is not None:
+            self.flush_interval = flush_interval
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(SCHEMA)
+
+        # Everything is read once here, lookups during the run never touch the database
+        for wallet, step, status in db.execute("SELECT wallet, step, status FROM steps"):
+            self._steps[(wallet, step)] = status
+        for tx_hash, wallet, step, nonce, status in db.execute("SELECT tx_hash, wallet, step, nonce, status FROM txs"):
+            self._index_tx(tx_hash, wallet, step, nonce, status)
+        for wallet, nonce, cycles in db.execute("SELECT wallet, nonce, cycles FROM wallets"):
+            self._wallets[wallet] = {"nonce": nonce, "cycles": cycles}
+        for wallet, token, balance in db.execute("SELECT wallet, token, balance FROM balances"):
+            self._balances[(wallet, token)] = balance
+        self._db = db
+
+    def _write(self, dirty: dict[str, dict]) -> None:
+        with self._db_lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO steps (wallet, step, status, updated) VALUES (?, ?, ?, ?)",
+                [(*key, *row) for key, row in dirty["steps"].items()]
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO txs (tx_hash, wallet, step, nonce, status, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, *row) for key, row in dirty["txs"].items()]
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO wallets (wallet, nonce, cycles, updated) VALUES (?, ?, ?, ?)",
+                [(key, *row) for key, row in dirty["wallets"].items()]
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO balances (wallet, token, balance, updated) VALUES (?, ?, ?, ?)",
+                [(*key, *row) for key, row in dirty["balances"].items()]
+            )
+
+    def _lock(self) -> asyncio.Lock:
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        return self._flush_lock
+
+    async def flush(self) -> None:
+        if self._db is None:
+            return
+        async with self._lock():
+            dirty = self._dirty
+            if not any(dirty.values()):
+                return
+            self._dirty = {"steps": {}, "txs": {}, "wallets": {}, "balances": {}}
+            await asyncio.get_running_loop().run_in_executor(None, self._write, dirty)
+
+    async def _flush_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            await self.flush()
+        except Exception as ex:
+            logger.error(f'Something went wrong | {ex}')
+
+    def _changed(self, table: str, key: Any, row: tuple) -> None:
+        # Writes from every wallet are collected and committed together in one transaction
+        if self._db is None:
+            return
+        self._dirty[table][key] = (*row, time.time())
+        if sum(len(rows) for rows in self._dirty.values()) >= self.batch_size:
+            task = asyncio.ensure_future(self._flush_later(0))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush_later(self.flush_interval))
+
+    async def close(self) -> None:
+        if self._db is None:
+            return
+        await asyncio.gather(*self._background)
+        await self.flush()
+        self._db.close()
+        self._db = None
+
+    def get_step(self, wallet: str, step: str) -> str | None:
+        return self._steps.get((Web3.to_checksum_address(wallet), step))
+
+    def set_step(self, wallet: str, step: str, status: str) -> None:
+        key = (Web3.to_checksum_address(wallet), step)
+        self._steps[key] = status
+        self._changed("steps", key, (status,))
+
+    def step_txs(self, wallet: str, step: str) -> list[dict]:
+        tx_hashes = self._step_txs.get((Web3.to_checksum_address(wallet), step), [])
+        txs = [{"tx_hash": tx_hash, **self._txs[tx_hash]} for tx_hash in tx_hashes]
+        return sorted(txs, key=lambda tx: tx["nonce"] if tx["nonce"] is not None else -1)
+
+    def last_tx(self, wallet: str, step: str) -> str | None:
+        # Hash of the newest transaction a step sent, e.g. to pick its outcome up after a restart
+        txs = self.step_txs(wallet, step)
+        return txs[-1]["tx_hash"] if txs else None
+
+    def _index_tx(self, tx_hash: str, wallet: str, step: str | None, nonce: int | None, status: str) -> None:
+        if tx_hash not in self._txs:
+            self._step_txs.setdefault((wallet, step), []).append(tx_hash)
+        self._txs[tx_hash] = {"wallet": wallet, "step": step, "nonce": nonce, "status": status}
+        in_flight = self._in_flight.setdefault(wallet, set())
+        if status == "sent":
+            in_flight.add(tx_hash)
+        else:
+            in_flight.discard(tx_hash)
+
+    def set_tx(self, tx_hash: str, wallet: str, step: str | None, nonce: int | None, status: str) -> None:
+        wallet = Web3.to_checksum_address(wallet)
+        self._index_tx(tx_hash, wallet, step, nonce, status)
+        self._changed("txs", tx_hash, (wallet, step, nonce, status))
+
+    async def record_tx(self, tx_hash: str, wallet: str, step: str, nonce: int) -> None:
+        # Committed before the transaction is broadcast, so after a crash the step is known to have
+        # something in flight and is reconciled instead of sending the same swap again
+        wallet = Web3.to_checksum_address(wallet)
+        now = time.time()
+        self._index_tx(tx_hash, wallet, step, nonce, "sent")
+        self._steps[(wallet, step)] = "started"
+        wallet_row = self._wallets.setdefault(wallet, {"nonce": None, "cycles": 0})
+        wallet_row["nonce"] = nonce + 1
+        rows = {
+            "steps": {(wallet, step): ("started", now)},
+            "txs": {tx_hash: (wallet, step, nonce, "sent", now)},
+            "wallets": {wallet: (wallet_row["nonce"], wallet_row["cycles"], now)},
+            "balances": {}
+        }
+        if self._db is None:
+            return
+        async with self._lock():
+            for table, table_rows in rows.items():
+                for key in table_rows:
+                    self._dirty[table].pop(key, None)
+            await asyncio.get_running_loop().run_in_executor(None, self._write, rows)
+
+    def get_nonce(self, wallet: str) -> int | None:
+        return self._wallets.get(Web3.to_checksum_address(wallet), {}).get("nonce")
+
+    def get_cycles(self, wallet: str) -> int:
+        return self._wallets.get(Web3.to_checksum_address(wallet), {}).get("cycles", 0)
+
+    def _set_wallet(self, wallet: str, **values: int) -> None:
+        wallet = Web3.to_checksum_address(wallet)
+        row = self._wallets.setdefault(wallet, {"nonce": None, "cycles": 0})
+        row.update(values)
+        self._changed("wallets", wallet, (row["nonce"], row["cycles"]))
+
+    def set_nonce(self, wallet: str, nonce: int) -> None:
+        self._set_wallet(wallet, nonce=nonce)
+
+    def set_cycles(self, wallet: str, cycles: int) -> None:
+        self._set_wallet(wallet, cycles=cycles)
+
+    def get_balance(self, wallet: str, token: str) -> float | None:
+        return self._balances.get((Web3.to_checksum_address(wallet), Web3.to_checksum_address(token)))
+
+    def set_balance(self, wallet: str, token: str, balance: float) -> None:
+        key = (Web3.to_checksum_address(wallet), Web3.to_checksum_address(token))
+        self._balances[key] = balance
+        self._changed("balances", key, (balance,))
+
+    async def reconcile(self, web3: AsyncWeb3, wallet: str, timeout: float = 60) -> None:
+        # Only transactions that were sent but never seen mined are looked up again
+        wallet = Web3.to_checksum_address(wallet)
+        in_flight = list(self._in_flight.get(wallet, ()))
+        if not in_flight:
+            return
+        receipts = await asyncio.gather(
+            *[wait_for_transaction(web3, HexBytes(tx_hash), timeout) for tx_hash in in_flight],
+            return_exceptions=True
+        )
+        for tx_hash, receipt in zip(in_flight, receipts):
+            tx = self._txs[tx_hash]
+            if isinstance(receipt, TimeExhausted):
+                status = "dropped"
+            elif isinstance(receipt, Exception):
+                logger.error(f'Something went wrong | {receipt}')
+                continue
+            else:
+                status = "ok" if receipt["status"] == 1 else "failed"
+            self.set_tx(tx_hash, wallet, tx["step"], tx["nonce"], status)
+            logger.info(f'Reconciled {tx_hash} of {wallet} ({tx["step"]}) | {status}')
+
+    async def run_step(
+            self,
+            web3: AsyncWeb3,
+            wallet: str,
+            step: str,
+            action: Callable[[], Awaitable[Any]],
+            txs: int = 1
+    ) -> Any:
+        # Completed steps are skipped. A step cut short by a restart counts as done when its last
+        # `txs` transactions all landed, otherwise it runs again.
+        if self._db is None:
+            return await action()
+        wallet = Web3.to_checksum_address(wallet)
+        status = self.get_step(wallet, step)
+        if status == "started":
+            await self.reconcile(web3, wallet)
+            sent = self.step_txs(wallet, step)
+            if len(sent) >= txs and all(tx["status"] == "ok" for tx in sent[-txs:]):
+                self.set_step(wallet, step, "done")
+                status = "done"
+        if status == "done":
+            logger.info(f'{step} already done for {wallet}, skipping')
+            return True
+
+        self.set_step(wallet, step, "started")
+        token = _current_step.set((wallet, step))
+        try:
+            result = await action()
+        finally:
+            _current_step.reset(token)
+        if result is not None:
+            for tx in self.step_txs(wallet, step):
+                if tx["status"] == "sent":
+                    self.set_tx(tx["tx_hash"], wallet, step, tx["nonce"], "settled")
+            self.set_step(wallet, step, "done")
+        return result
+
+
+progress_store = ProgressStore()
+
+
+async def checkpoint_stage(intent) -> None:
+    # Runs between signing and broadcast, the signed hash is what the chain will know the tx by
+    if not progress_store.enabled:
+        return
+    # Approvals are not counted towards a step, the allowance ledger makes repeating them free
+    if intent.call is not None and intent.call.fn_name == "approve":
+        progress_store.set_nonce(intent.address, intent.nonce + 1)
+        return
+    current = _current_step.get()
+    if current is not None and current[0] == intent.address:
+        await progress_store.record_tx(intent.web3.to_hex(intent.signed_tx.hash), intent.address, current[1], intent.nonce)
+    else:
+        progress_store.set_nonce(intent.address, intent.nonce + 1)
@@ -0,0 +1,426 @@
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from contextvars import Context, ContextVar
+from typing import Any, Coroutine, Iterator
+
+import requests
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from requests.adapters import HTTPAdapter
+from web3 import AsyncHTTPProvider, AsyncWeb3, Web3
+from web3._utils.encoding import FriendlyJsonSerde, Web3JsonEncoder
+from web3.providers.async_base import AsyncJSONBaseProvider
+from loguru import logger
+from web3.types import RPCEndpoint, RPCResponse
+
+from .ratelimit import rate_limiter
+
+_use_async_transport = True
+_pool_settings = {
+    "pool_size": 100,
+    "limit_per_host": 0,
+    "keepalive_timeout": 30,
+    "request_timeout": 30,
+    "max_batch_size": 50
+}
+_web3_instances: dict[tuple, AsyncWeb3] = {}
+_wallet_affinity: ContextVar[str | None] = ContextVar("wallet_affinity", default=None)
+
+# Answers that never change for an endpoint. web3 asks for the chain id before every contract call.
+CONSTANT_METHODS = {"eth_chainId"}
+
+LATENCY_SMOOTHING = 0.2
+DEFAULT_LATENCY = 0.1
+ERROR_RATE_PENALTY = 10
+BREAKER_FAILURES = 3
+BREAKER_COOLDOWN = 5
+BREAKER_MAX_COOLDOWN = 120
+
+# JSON-RPC errors caused by the request rather than the endpoint: reverted, unknown method, invalid params
+REQUEST_ERROR_CODES = {3, -32601, -32602}
+REQUEST_ERRORS = (
+    "execution reverted",
+    "nonce",
+    "insufficient funds",
+    "already known",
+    "underpriced",
+    "gas required exceeds",
+    "intrinsic gas"
+)
+
+BATCHABLE_METHODS = {
+    "eth_call",
+    "eth_chainId",
+    "eth_blockNumber",
+    "eth_gasPrice",
+    "eth_getBalance",
+    "eth_getTransactionCount",
+    "eth_getTransactionReceipt",
+    "eth_getCode",
+    "eth_getBlockByNumber",
+    "eth_feeHistory"
+}
+
+
+class PooledHTTPProvider(AsyncHTTPProvider):
+    # Owns one keep-alive aiohttp session for its endpoint instead of opening
+    # connections through web3's per-call session cache.
+    def __init__(self, endpoint_uri: str, request_kwargs: dict | None = None) -> None:
+        super().__init__(endpoint_uri, request_kwargs)
+        self._session: ClientSession | None = None
+        self._session_loop: asyncio.AbstractEventLoop | None = None
+        self._batch: list[tuple[dict, asyncio.Future]] = []
+        self._batch_flush_scheduled = False
+        self._batch_tasks: set[asyncio.Task] = set()
+        self._constant_responses: dict[str, RPCResponse] = {}
+
+    async def get_session(self) -> ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = TCPConnector(
+                limit=_pool_settings["pool_size"],
+                limit_per_host=_pool_settings["limit_per_host"],
+                keepalive_timeout=_pool_settings["keepalive_timeout"]
+            )
+            self._session = ClientSession(
+                connector=connector,
+                timeout=ClientTimeout(total=_pool_settings["request_timeout"])
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def _post(self, request_data: bytes) -> Any:
+        session = await self.get_session()
+        await rate_limiter.acquire(self.endpoint_uri)
+        async with session.post(self.endpoint_uri, data=request_data, **self.get_request_kwargs()) as response:
+            if response.status == 429:
+                rate_limiter.throttled(self.endpoint_uri, response.headers.get("Retry-After"))
+            response.raise_for_status()
+            raw_response = await response.read()
+        return self.decode_rpc_response(raw_response)
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        if method in self._constant_responses:
+            return self._constant_responses[method]
+        if method in BATCHABLE_METHODS and _pool_settings["max_batch_size"] > 1:
+            response = await self._enqueue(method, params)
+        else:
+            response = await self._post(self.encode_rpc_request(method, params))
+        if method in CONSTANT_METHODS and "result" in response:
+            self._constant_responses[method] = response
+        return response
+
+    async def _enqueue(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        # Reads issued during the same loop iteration are sent as one JSON-RPC batch.
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        request = {"jsonrpc": "2.0", "method": method, "params": params or [], "id": next(self.request_counter)}
+        self._batch.append((request, future))
+
+        if len(self._batch) >= _pool_settings["max_batch_size"]:
+            self._flush_batch()
+        elif not self._batch_flush_scheduled:
+            self._batch_flush_scheduled = True
+            loop.call_soon(self._flush_batch)
+        return await future
+
+    def _flush_batch(self) -> None:
+        self._batch_flush_scheduled = False
+        batch, self._batch = self._batch, []
+        if batch:
+            task = asyncio.create_task(self._send_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _send_batch(self, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        try:
+            if len(batch) == 1:
+                payload = batch[0][0]
+            else:
+                payload = [request for request, _ in batch]
+            response = await self._post(self._encode(payload))
+
+            if isinstance(response, list):
+                responses = {item.get("id"): item for item in response}
+            elif len(batch) == 1:
+                responses = {batch[0][0]["id"]: response}
+            else:
+                # The node rejected the batch as a whole, fall back to single requests
+                responses = {}
+                singles = await asyncio.gather(
+                    *(self._post(self._encode(request)) for request, _ in batch),
+                    return_exceptions=True
+                )
+                for (request, future), single in zip(batch, singles):
+                    if isinstance(single, Exception):
+                        future.set_exception(single)
+                    else:
+                        responses[request["id"]] = single
+
+            for request, future in batch:
+                if future.done():
+                    continue
+                if request["id"] in responses:
+                    future.set_result(responses[request["id"]])
+                else:
+                    future.set_exception(ValueError(f"No response for {request['method']} in batch"))
+        except Exception as ex:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(ex)
+
+    @staticmethod
+    def _encode(payload: Any) -> bytes:
+        return FriendlyJsonSerde().json_encode(payload, cls=Web3JsonEncoder).encode()
+
+    async def disconnect(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class ThreadedHTTPProvider(AsyncJSONBaseProvider):
+    # Keeps the blocking requests-based HTTPProvider available behind the async API,
+    # each request runs on a worker thread so the event loop is never blocked.
+    def __init__(self, endpoint_uri: str, request_kwargs: dict | None = None) -> None:
+        super().__init__()
+        self.endpoint_uri = endpoint_uri
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_pool_settings["pool_size"])
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        request_kwargs = {"timeout": _pool_settings["request_timeout"], **(request_kwargs or {})}
+        self._provider = Web3.HTTPProvider(endpoint_uri, request_kwargs=request_kwargs, session=session)
+        self._constant_responses: dict[str, RPCResponse] = {}
+
+    def __str__(self) -> str:
+        return f"Threaded RPC connection {self.endpoint_uri}"
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        if method in self._constant_responses:
+            return self._constant_responses[method]
+        await rate_limiter.acquire(self.endpoint_uri)
+        response = await asyncio.to_thread(self._provider.make_request, method, params)
+        if method in CONSTANT_METHODS and "result" in response:
+            self._constant_responses[method] = response
+        return response
+
+    async def disconnect(self) -> None:
+        pass
+
+
+class EndpointHealth:
+    def __init__(self, provider: AsyncJSONBaseProvider, uri: str) -> None:
+        self.provider = provider
+        self.uri = uri
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.open_until = 0.0
+        self.cooldown = BREAKER_COOLDOWN
+        self.probing = False
+
+    @property
+    def available(self) -> bool:
+        return not self.open_until
+
+    @property
+    def score(self) -> float:
+        # Expected cost of a request, lower is better
+        return (self.latency or DEFAULT_LATENCY) * (1 + ERROR_RATE_PENALTY * self.error_rate)
+
+    def record_success(self, latency: float) -> None:
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += LATENCY_SMOOTHING * (latency - self.latency)
+        self.error_rate *= 1 - LATENCY_SMOOTHING
+        self.failures = 0
+        if self.open_until:
+            logger.info(f'RPC {self.uri} is healthy again')
+            self.open_until = 0.0
+            self.cooldown = BREAKER_COOLDOWN
+
+    def record_failure(self) -> None:
+        self.error_rate += LATENCY_SMOOTHING * (1 - self.error_rate)
+        self.failures += 1
+        if self.failures >= BREAKER_FAILURES:
+            if not self.open_until:
+                logger.warning(f'RPC {self.uri} failed {self.failures} times in a row, ejecting for {self.cooldown} s')
+            self.open_until = time.monotonic() + self.cooldown
+            self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+
+
+def is_request_error(error: Any) -> bool:
+    # Errors about the request itself (reverts, bad params, nonce or funds) come back the same
+    # from any endpoint, they say nothing about the endpoint's health
+    if not isinstance(error, dict):
+        return False
+    if error.get("code") in REQUEST_ERROR_CODES:
+        return True
+    message = str(error.get("message", "")).lower()
+    return any(request_error in message for request_error in REQUEST_ERRORS)
+
+
+class LoadBalancedProvider(AsyncJSONBaseProvider):
+    # Spreads reads over several endpoints by measured latency and error rate. Requests made
+    # inside wallet_affinity() stay on one endpoint per wallet so nonces and pending state agree.
+    def __init__(self, endpoint_uris: list[str]) -> None:
+        super().__init__()
+        provider_class = PooledHTTPProvider if _use_async_transport else ThreadedHTTPProvider
+        self.endpoints = [EndpointHealth(provider_class(uri), uri) for uri in endpoint_uris]
+        self._sticky: dict[str, EndpointHealth] = {}
+        self._probes: set[asyncio.Task] = set()
+
+    def __str__(self) -> str:
+        return f"Load balanced RPC connection {[endpoint.uri for endpoint in self.endpoints]}"
+
+    def _schedule_probes(self) -> None:
+        now = time.monotonic()
+        for endpoint in self.endpoints:
+            if endpoint.open_until and now >= endpoint.open_until and not endpoint.probing:
+                endpoint.probing = True
+                task = asyncio.create_task(self._probe(endpoint))
+                self._probes.add(task)
+                task.add_done_callback(self._probes.discard)
+
+    async def _probe(self, endpoint: EndpointHealth) -> None:
+        started = time.monotonic()
+        try:
+            response = await endpoint.provider.make_request(RPCEndpoint("eth_blockNumber"), [])
+            if "error" in response:
+                raise ValueError(response["error"])
+            endpoint.record_success(time.monotonic() - started)
+        except Exception:
+            endpoint.record_failure()
+        finally:
+            endpoint.probing = False
+
+    def _choose(self, address: str | None, tried: set[str]) -> EndpointHealth:
+        self._schedule_probes()
+        candidates = [endpoint for endpoint in self.endpoints if endpoint.uri not in tried and endpoint.available]
+        if not candidates:
+            # Everything is ejected, go with the endpoint that is closest to being probed again
+            candidates = [min(
+                (endpoint for endpoint in self.endpoints if endpoint.uri not in tried),
+                key=lambda endpoint: endpoint.open_until
+            )]
+
+        if address is not None:
+            pinned = self._sticky.get(address)
+            if pinned is None or not pinned.available:
+                pinned = self._sticky[address] = candidates[int(address, 16) % len(candidates)]
+            if pinned in candidates:
+                return pinned
+            return candidates[int(address, 16) % len(candidates)]
+
+        return random.choices(candidates, weights=[1 / endpoint.score for endpoint in candidates])[0]
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        address = _wallet_affinity.get()
+        tried: set[str] = set()
+        while True:
+            endpoint = self._choose(address, tried)
+            started = time.monotonic()
+            try:
+                response = await endpoint.provider.make_request(method, params)
+            except Exception as ex:
+                endpoint.record_failure()
+                tried.add(endpoint.uri)
+                # The node may have taken the transaction before failing, a second node would only
+                # answer "already known"; the engine looks the hash up instead
+                if method == "eth_sendRawTransaction" or len(tried) == len(self.endpoints):
+                    raise
+                logger.warning(f'RPC {endpoint.uri} failed on {method}, trying another endpoint | {ex}')
+                continue
+            error = response.get("error")
+            if error is None or is_request_error(error):
+                endpoint.record_success(time.monotonic() - started)
+                return response
+
+            # The node answered but failed the call itself, that counts against its health
+            endpoint.record_failure()
+            tried.add(endpoint.uri)
+            if method == "eth_sendRawTransaction" or len(tried) == len(self.endpoints):
+                return response
+            logger.warning(f'RPC {endpoint.uri} returned an error on {method}, trying another endpoint | {error}')
+
+    def health(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "uri": endpoint.uri,
+                "latency": endpoint.latency,
+                "error_rate": endpoint.error_rate,
+                "available": endpoint.available
+            }
+            for endpoint in self.endpoints
+        ]
+
+    async def disconnect(self) -> None:
+        for task in list(self._probes):
+            task.cancel()
+        for endpoint in self.endpoints:
+            await endpoint.provider.disconnect()
+
+
+def shared_task(coro: Coroutine) -> asyncio.Task:
+    # Pollers and requests shared by every wallet start from an empty context, otherwise they
+    # would stay pinned to the endpoint of whichever wallet happened to create them
+    return asyncio.get_running_loop().create_task(coro, context=Context())
+
+
+@contextmanager
+def wallet_affinity(address: str) -> Iterator[None]:
+    token = _wallet_affinity.set(address)
+    try:
+        yield
+    finally:
+        _wallet_affinity.reset(token)
+
+
+def set_async_transport(enabled: bool) -> None:
+    global _use_async_transport
+    _use_async_transport = enabled
+
+
+def set_pool_limits(
+        pool_size: int | None = None,
+        limit_per_host: int | None = None,
+        keepalive_timeout: float | None = None,
+        request_timeout: float | None = None,
+        max_batch_size: int | None = None
+) -> None:
+    # Applies to sessions opened after the call, existing pools keep their limits.
+    for key, value in (
+            ("pool_size", pool_size),
+            ("limit_per_host", limit_per_host),
+            ("keepalive_timeout", keepalive_timeout),
+            ("request_timeout", request_timeout),
+            ("max_batch_size", max_batch_size)
+    ):
+        if value is not None:
+            _pool_settings[key] = value
+
+
+def get_web3(node: str | list[str]) -> AsyncWeb3:
+    # A list of urls gives one load balanced instance over all of them
+    if not isinstance(node, str) and len(node) == 1:
+        node = node[0]
+    key = (node if isinstance(node, str) else tuple(node), _use_async_transport)
+    web3 = _web3_instances.get(key)
+    if web3 is None:
+        if not isinstance(node, str):
+            provider = LoadBalancedProvider(list(node))
+        elif _use_async_transport:
+            provider = PooledHTTPProvider(node)
+        else:
+            provider = ThreadedHTTPProvider(node)
+        web3 = AsyncWeb3(provider)
+        _web3_instances[key] = web3
+    return web3
+
+
+async def close_providers() -> None:
+    for web3 in _web3_instances.values():
+        await web3.provider.disconnect()
@@ -0,0 +1,190 @@
+import asyncio
+from typing import Iterable
+
+from web3 import AsyncWeb3, Web3
+
+from .helper import get_contract
+from .tokens import token_registry
+
+SYNC_SWAP_MAX_FEE = 100000
+SYNC_SWAP_STABLE_A = 1000
+SYNC_SWAP_STABLE_POOL_TYPE = 2
+MUTE_FEE_PRECISION = 10000
+MAX_LOOP_LIMIT = 256
+ONE = 10 ** 18
+
+
+class QuoteError(Exception):
+    pass
+
+
+def _within1(a: int, b: int) -> bool:
+    return abs(a - b) <= 1
+
+
+def _stable_d(xp0: int, xp1: int, a: int = SYNC_SWAP_STABLE_A) -> int:
+    # SyncSwap StableMath.computeDFromAdjustedBalances
+    s = xp0 + xp1
+    if s == 0:
+        return 0
+    d = s
+    n_a = a * 2
+    for _ in range(MAX_LOOP_LIMIT):
+        d_p = (((d * d) // xp0) * d) // xp1 // 4
+        prev_d = d
+        d = (((n_a * s) + 2 * d_p) * d) // ((n_a - 1) * d + 3 * d_p)
+        if _within1(d, prev_d):
+            break
+    return d
+
+
+def _stable_y(x: int, d: int, a: int = SYNC_SWAP_STABLE_A) -> int:
+    # SyncSwap StableMath.getY
+    n_a = a * 2
+    c = (d * d) // (x * 2)
+    c = (c * d) // (n_a * 2)
+    b = x + d // n_a
+    y = d
+    for _ in range(MAX_LOOP_LIMIT):
+        y_prev = y
+        y = (y * y + c) // (y * 2 + b - d)
+        if _within1(y, y_prev):
+            break
+    return y
+
+
+def _solidly_k(x: int, y: int) -> int:
+    a = x * y // ONE
+    b = x * x // ONE + y * y // ONE
+    return a * b // ONE
+
+
+def _solidly_f(x0: int, y: int) -> int:
+    return x0 * (y * y // ONE * y // ONE) // ONE + (x0 * x0 // ONE * x0 // ONE) * y // ONE
+
+
+def _solidly_d(x0: int, y: int) -> int:
+    return 3 * x0 * (y * y // ONE) // ONE + (x0 * x0 // ONE * x0 // ONE)
+
+
+def _solidly_y(x0: int, xy: int, y: int) -> int:
+    # Newton iteration on x^3 * y + y^3 * x = k, as in the Solidly style pairs Mute is based on
+    for _ in range(MAX_LOOP_LIMIT):
+        y_prev = y
+        k = _solidly_f(x0, y)
+        if k < xy:
+            y += (xy - k) * ONE // _solidly_d(x0, y)
+        else:
+            y -= (k - xy) * ONE // _solidly_d(x0, y)
+        if _within1(y, y_prev):
+            break
+    return y
+
+
+def get_amount_out(pool: dict, amount_in: int) -> int:
+    reserve_in, reserve_out = pool["reserve_in"], pool["reserve_out"]
+    if amount_in <= 0:
+        return 0
+
+    if pool["dex"] == "syncswap":
+        if not pool["stable"]:
+            amount_in_with_fee = amount_in * (SYNC_SWAP_MAX_FEE - pool["fee"])
+            return amount_in_with_fee * reserve_out // (reserve_in * SYNC_SWAP_MAX_FEE + amount_in_with_fee)
+
+        multiplier_in = 10 ** (18 - pool["decimals_in"])
+        multiplier_out = 10 ** (18 - pool["decimals_out"])
+        fee_deducted_amount_in = amount_in - amount_in * pool["fee"] // SYNC_SWAP_MAX_FEE
+        adjusted_reserve_in = reserve_in * multiplier_in
+        adjusted_reserve_out = reserve_out * multiplier_out
+        d = _stable_d(adjusted_reserve_in, adjusted_reserve_out)
+        y = _stable_y(adjusted_reserve_in + fee_deducted_amount_in * multiplier_in, d)
+        return max(adjusted_reserve_out - y - 1, 0) // multiplier_out
+
+    if pool["dex"] == "mute":
+        amount_in -= amount_in * pool["fee"] // MUTE_FEE_PRECISION
+        if not pool["stable"]:
+            return amount_in * reserve_out // (reserve_in + amount_in)
+
+        decimals_in, decimals_out = 10 ** pool["decimals_in"], 10 ** pool["decimals_out"]
+        xy = _solidly_k(reserve_in * ONE // decimals_in, reserve_out * ONE // decimals_out)
+        reserve_a = reserve_in * ONE // decimals_in
+        reserve_b = reserve_out * ONE // decimals_out
+        amount_in = amount_in * ONE // decimals_in
+        y = reserve_b - _solidly_y(amount_in + reserve_a, xy, reserve_b)
+        return y * decimals_out // ONE
+
+    raise QuoteError(f"Unknown dex {pool['dex']}")
+
+
+def get_amounts_out(pool: dict, amounts_in: Iterable[int]) -> list[int]:
+    # One reserve snapshot priced against many input amounts
+    return [get_amount_out(pool, amount_in) for amount_in in amounts_in]
+
+
+async def get_sync_swap_pool(
+        web3: AsyncWeb3,
+        pool_address: str,
+        token_in: str,
+        token_out: str,
+        sender: str
+) -> dict:
+    if int(pool_address, 16) == 0:
+        raise QuoteError(f"No SyncSwap pool for {token_in} -> {token_out}")
+    token_in, token_out = Web3.to_checksum_address(token_in), Web3.to_checksum_address(token_out)
+    pool_contract = await get_contract(pool_address, web3, "sync_swap_classic_pool")
+
+    # Issued together, so they leave as one JSON-RPC batch
+    token0, pool_type, (reserve0, reserve1), fee, token_in_data, token_out_data = await asyncio.gather(
+        pool_contract.functions.token0().call(),
+        pool_contract.functions.poolType().call(),
+        pool_contract.functions.getReserves().call(),
+        pool_contract.functions.getSwapFee(Web3.to_checksum_address(sender), token_in, token_out, b"").call(),
+        token_registry.get(web3, token_in),
+        token_registry.get(web3, token_out)
+    )
+    reserve_in, reserve_out = (reserve0, reserve1) if Web3.to_checksum_address(token0) == token_in \
+        else (reserve1, reserve0)
+    if not reserve_in or not reserve_out:
+        raise QuoteError(f"SyncSwap pool {pool_address} has no liquidity")
+    return {
+        "dex": "syncswap",
+        "pool": pool_address,
+        "stable": pool_type == SYNC_SWAP_STABLE_POOL_TYPE,
+        "fee": fee,
+        "reserve_in": reserve_in,
+        "reserve_out": reserve_out,
+        "decimals_in": token_in_data["decimals"],
+        "decimals_out": token_out_data["decimals"]
+    }
+
+
+async def get_mute_pool(
+        web3: AsyncWeb3,
+        router_address: str,
+        token_in: str,
+        token_out: str,
+        stable: bool = False,
+        abi_name: str = "mute"
+) -> dict:
+    token_in, token_out = Web3.to_checksum_address(token_in), Web3.to_checksum_address(token_out)
+    router = await get_contract(router_address, web3, abi_name)
+    (token_a, _, pair, reserve_a, reserve_b, fee), token_in_data, token_out_data = await asyncio.gather(
+        router.functions.getPairInfo([token_in, token_out], stable).call(),
+        token_registry.get(web3, token_in),
+        token_registry.get(web3, token_out)
+    )
+    # The router returns the pair's sorted tokens with their reserves, not the order they were asked in
+    reserve_in, reserve_out = (reserve_a, reserve_b) if Web3.to_checksum_address(token_a) == token_in \
+        else (reserve_b, reserve_a)
+    if int(pair, 16) == 0 or not reserve_in or not reserve_out:
+        raise QuoteError(f"No Mute {'stable' if stable else 'volatile'} pair with liquidity for {token_in} -> {token_out}")
+    return {
+        "dex": "mute",
+        "pool": pair,
+        "stable": stable,
+        "fee": fee,
+        "reserve_in": reserve_in,
+        "reserve_out": reserve_out,
+        "decimals_in": token_in_data["decimals"],
+        "decimals_out": token_out_data["decimals"]
+    }
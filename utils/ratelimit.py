@@ -0,0 +1,84 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        # The lock keeps waiters in FIFO order, so a busy host is shared fairly between wallets
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+
+class RateLimiter:
+    def __init__(self, default_rate: float | None = None, backoff: float = 1) -> None:
+        self.default_rate = default_rate
+        self.backoff = backoff
+        self._limits: dict[str, tuple[float, float | None]] = {}
+        self._buckets: dict[str, TokenBucket] = {}
+
+    @staticmethod
+    def host(url: str) -> str:
+        return urlsplit(url).netloc or url
+
+    def configure(self, limits: dict | None = None, default_rate: float | None = None) -> None:
+        # limits maps a host (or url) to requests per second, or to (requests per second, burst)
+        for host, limit in (limits or {}).items():
+            rate, capacity = limit if isinstance(limit, (tuple, list)) else (limit, None)
+            self._limits[self.host(host)] = (rate, capacity)
+        if default_rate is not None:
+            self.default_rate = default_rate
+        self._buckets.clear()
+
+    def _bucket(self, url: str) -> TokenBucket | None:
+        host = self.host(url)
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, capacity = self._limits.get(host, (self.default_rate, None))
+            if not rate:
+                return None
+            bucket = self._buckets[host] = TokenBucket(rate, capacity)
+        return bucket
+
+    async def acquire(self, url: str) -> None:
+        bucket = self._bucket(url)
+        if bucket is not None:
+            await bucket.acquire()
+
+    def throttled(self, url: str, retry_after: str | None = None) -> None:
+        # Called on a 429, holds every request to a rate limited host for Retry-After (or the default backoff)
+        bucket = self._bucket(url)
+        if bucket is not None:
+            try:
+                seconds = float(retry_after) if retry_after else self.backoff
+            except ValueError:
+                seconds = self.backoff
+            bucket.pause(seconds)
+
+
+rate_limiter = RateLimiter()
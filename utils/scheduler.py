@@ -0,0 +1,95 @@
+import asyncio
+import itertools
+import time
+from typing import Any, Awaitable, Callable
+
+from loguru import logger
+
+
+class FleetScheduler:
+    def __init__(self, max_in_flight: int = 10, report_interval: float = 30) -> None:
+        self.max_in_flight = max_in_flight
+        self.report_interval = report_interval
+        self._queue: asyncio.PriorityQueue | None = None
+        self._pending: list[tuple[int, int, str, Callable[[], Awaitable[Any]]]] = []
+        self._order = itertools.count()
+        self.results: dict[str, Any] = {}
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.in_flight = 0
+        self._started = 0.0
+
+    def submit(self, name: str, job: Callable[[], Awaitable[Any]], priority: int = 0) -> None:
+        # Lower priority values run first, equal priorities keep submission order
+        item = (priority, next(self._order), name, job)
+        self.total += 1
+        if self._queue is not None:
+            self._queue.put_nowait(item)
+        else:
+            self._pending.append(item)
+
+    async def _worker(self) -> None:
+        # Every worker pulls the next wallet as soon as it is free, so a slow wallet never holds up the rest
+        while True:
+            try:
+                _, _, name, job = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            self.in_flight += 1
+            try:
+                self.results[name] = await job()
+            except (Exception, SystemExit) as ex:
+                # A job that calls exit() fails its own wallet, not the whole fleet
+                self.failed += 1
+                self.results[name] = ex
+                logger.error(f'{name} | Something went wrong | {ex}')
+            finally:
+                self.in_flight -= 1
+                self.done += 1
+                self._queue.task_done()
+
+    def progress(self) -> dict[str, float]:
+        elapsed = time.monotonic() - self._started if self._started else 0
+        throughput = self.done / elapsed * 60 if elapsed else 0
+        remaining = self.total - self.done
+        return {
+            "done": self.done,
+            "failed": self.failed,
+            "total": self.total,
+            "in_flight": self.in_flight,
+            "throughput_per_minute": throughput,
+            "eta_seconds": remaining / throughput * 60 if throughput else float("inf")
+        }
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(self.report_interval)
+            progress = self.progress()
+            eta = progress["eta_seconds"]
+            logger.info(
+                f'Fleet progress: {progress["done"]}/{progress["total"]} wallets done, {progress["failed"]} failed, '
+                f'{progress["in_flight"]} in flight | {progress["throughput_per_minute"]:.2f} wallets/min | '
+                f'ETA {"unknown" if eta == float("inf") else f"{eta / 60:.1f} min"}'
+            )
+
+    async def run(self) -> dict[str, Any]:
+        self._queue = asyncio.PriorityQueue()
+        for item in self._pending:
+            self._queue.put_nowait(item)
+        self._pending = []
+        self._started = time.monotonic()
+
+        reporter = asyncio.create_task(self._report())
+        workers = [asyncio.create_task(self._worker()) for _ in range(min(self.max_in_flight, self.total) or 1)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            reporter.cancel()
+            for worker in workers:
+                worker.cancel()
+            self._queue = None
+
+        elapsed = time.monotonic() - self._started
+        logger.info(f'Fleet finished: {self.done}/{self.total} wallets, {self.failed} failed in {elapsed:.1f} s')
+        return self.results
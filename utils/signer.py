@@ -0,0 +1,67 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from eth_account import Account
+from eth_account.datastructures import SignedTransaction
+
+# Accounts living inside each worker process, loaded once by the pool initializer
+_worker_accounts: dict = {}
+
+
+def _init_worker(private_keys: list[str]) -> None:
+    for private_key in private_keys:
+        account = Account.from_key(private_key)
+        _worker_accounts[account.address] = account
+
+
+def _sign_loaded(tx: dict, address: str) -> SignedTransaction:
+    return _worker_accounts[address].sign_transaction(tx)
+
+
+def _sign_with_key(tx: dict, private_key: str) -> SignedTransaction:
+    return Account.sign_transaction(tx, private_key)
+
+
+@lru_cache(maxsize=None)
+def get_address(private_key: str) -> str:
+    return Account.from_key(private_key).address
+
+
+class SigningService:
+    def __init__(self) -> None:
+        self._executor: ProcessPoolExecutor | None = None
+        self._loaded: set[str] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self._executor is not None
+
+    def start(self, private_keys: list[str], processes: int | None = None) -> None:
+        # Keys are shipped to every worker once, afterwards only the tx and the address cross the process boundary
+        self.stop()
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_worker,
+            initargs=(list(private_keys),)
+        )
+        self._loaded = {get_address(private_key) for private_key in private_keys}
+
+    def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+            self._loaded = set()
+
+    async def sign(self, tx: dict, private_key: str) -> SignedTransaction:
+        if self._executor is None:
+            return Account.sign_transaction(tx, private_key)
+
+        loop = asyncio.get_running_loop()
+        address = get_address(private_key)
+        if address in self._loaded:
+            return await loop.run_in_executor(self._executor, _sign_loaded, dict(tx), address)
+        return await loop.run_in_executor(self._executor, _sign_with_key, dict(tx), private_key)
+
+
+signing_service = SigningService()
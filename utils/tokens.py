@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+
+from eth_abi import decode
+from loguru import logger
+from web3 import AsyncWeb3, Web3
+
+TOKENS_CACHE_FILE = Path(__file__).resolve().parent / "cache" / "tokens.json"
+# Bumped whenever cached entries can no longer be trusted, older files are ignored on load
+TOKENS_CACHE_VERSION = 2
+
+DECIMALS_SELECTOR = "0x313ce567"
+SYMBOL_SELECTOR = "0x95d89b41"
+
+
+class TokenRegistry:
+    def __init__(self, cache_file: str | Path = TOKENS_CACHE_FILE) -> None:
+        self.cache_file = Path(cache_file)
+        self._tokens: dict[int, dict[str, dict]] = {}
+        self._pending: dict[int, set[str]] = {}
+        # Entries read from disk, their decimals are checked against the chain once per process
+        self._unverified: dict[int, set[str]] = {}
+        self._chain_ids: dict = {}
+        self._lock = asyncio.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.cache_file) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != TOKENS_CACHE_VERSION:
+            logger.info(f'Ignoring outdated token cache {self.cache_file}')
+            return
+        for chain_id, tokens in data["chains"].items():
+            self._tokens.setdefault(int(chain_id), {}).update(tokens)
+            self._unverified.setdefault(int(chain_id), set()).update(tokens)
+
+    def _save(self) -> None:
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.cache_file.with_suffix(".tmp")
+        with open(tmp_file, "w") as f:
+            json.dump({
+                "version": TOKENS_CACHE_VERSION,
+                "chains": {str(chain_id): tokens for chain_id, tokens in self._tokens.items()}
+            }, f, indent=2)
+        os.replace(tmp_file, self.cache_file)
+
+    def clear(self, chain_id: int | None = None) -> None:
+        # Drops bad entries for one chain (or all of them), they are fetched again on next use
+        chain_ids = list(self._tokens) if chain_id is None else [chain_id]
+        for chain_id in chain_ids:
+            self._tokens.pop(chain_id, None)
+            self._pending.pop(chain_id, None)
+            self._unverified.pop(chain_id, None)
+        self._save()
+
+    def _stale(self, chain_id: int, address: str) -> bool:
+        token = self._tokens.get(chain_id, {}).get(address)
+        return token is None or token["decimals"] is None or address in self._unverified.get(chain_id, ())
+
+    def seed(self, tokens: dict[str, str], chain_id: int) -> None:
+        known = self._tokens.setdefault(chain_id, {})
+        pending = self._pending.setdefault(chain_id, set())
+        for symbol, address in tokens.items():
+            address = Web3.to_checksum_address(address)
+            token = known.setdefault(address, {
+                "address": address,
+                "chain_id": chain_id,
+                "symbol": None,
+                "decimals": None
+            })
+            # The config names the token, the cache only remembers what the chain said
+            token["symbol"] = symbol.upper()
+            if self._stale(chain_id, address):
+                pending.add(address)
+
+    async def get_chain_id(self, web3: AsyncWeb3) -> int:
+        chain_id = self._chain_ids.get(web3.provider)
+        if chain_id is None:
+            chain_id = await web3.eth.chain_id
+            self._chain_ids[web3.provider] = chain_id
+        return chain_id
+
+    async def get(self, web3: AsyncWeb3, token_ca: str) -> dict | None:
+        chain_id = await self.get_chain_id(web3)
+        address = Web3.to_checksum_address(token_ca)
+        if self._stale(chain_id, address):
+            await self.resolve(web3, [address])
+        return self._tokens.get(chain_id, {}).get(address)
+
+    async def resolve(self, web3: AsyncWeb3, token_addresses: list[str]) -> None:
+        chain_id = await self.get_chain_id(web3)
+        async with self._lock:
+            known = self._tokens.setdefault(chain_id, {})
+            wanted = self._pending.pop(chain_id, set()) | {Web3.to_checksum_address(a) for a in token_addresses}
+            unknown = [address for address in wanted if self._stale(chain_id, address)]
+            if not unknown:
+                return
+
+            results = await asyncio.gather(
+                *(self._fetch_metadata(web3, address) for address in unknown),
+                return_exceptions=True
+            )
+            for address, result in zip(unknown, results):
+                if isinstance(result, Exception):
+                    logger.error(f'Something went wrong | {result}')
+                    continue
+                decimals, symbol = result
+                token = known.setdefault(address, {
+                    "address": address,
+                    "chain_id": chain_id,
+                    "symbol": None,
+                    "decimals": None
+                })
+                if token["decimals"] not in (None, decimals):
+                    logger.warning(f'Cached decimals of {address} were {token["decimals"]}, chain says {decimals}')
+                token["decimals"] = decimals
+                self._unverified.get(chain_id, set()).discard(address)
+                if token["symbol"] is None:
+                    token["symbol"] = symbol
+            self._save()
+
+    @staticmethod
+    async def _fetch_metadata(web3: AsyncWeb3, address: str) -> tuple[int, str | None]:
+        decimals = decode(["uint8"], await web3.eth.call({"to": address, "data": DECIMALS_SELECTOR}))[0]
+        try:
+            raw_symbol = await web3.eth.call({"to": address, "data": SYMBOL_SELECTOR})
+            symbol = decode(["string"], raw_symbol)[0] if len(raw_symbol) > 32 \
+                else raw_symbol.rstrip(b"\x00").decode()
+        except Exception:
+            symbol = None
+        return decimals, symbol.upper() if symbol else None
+
+
+token_registry = TokenRegistry()
@@ -0,0 +1,134 @@
+import asyncio
+
+from eth_abi import decode, encode
+from web3 import AsyncWeb3, Web3
+from web3.exceptions import TimeExhausted
+
+from .confirm import DEFAULT_TIMEOUT, get_block_number, wait_for_block
+from .helper import L2_ETH_TOKEN_ADDRESS, is_eth
+from .provider import shared_task
+
+TRANSFER_TOPIC = Web3.keccak(text="Transfer(address,address,uint256)").hex()
+BALANCE_OF_SELECTOR = "0x70a08231"
+
+
+def _log_address(token: str) -> str:
+    return Web3.to_checksum_address(L2_ETH_TOKEN_ADDRESS if is_eth(token) else token)
+
+
+def _topic(address: str) -> str:
+    return "0x" + encode(["address"], [address]).hex()
+
+
+async def get_balance_wei(web3: AsyncWeb3, wallet: str, token: str, block_number: int | str = "latest") -> int:
+    wallet = Web3.to_checksum_address(wallet)
+    if is_eth(token):
+        return await web3.eth.get_balance(wallet, block_number)
+    raw = await web3.eth.call(
+        {"to": Web3.to_checksum_address(token), "data": BALANCE_OF_SELECTOR + encode(["address"], [wallet]).hex()},
+        block_number
+    )
+    return decode(["uint256"], raw)[0]
+
+
+class _Waiter:
+    def __init__(self, wallet: str, token: str, balance: int, block_number: int, deadline: float) -> None:
+        self.wallet = Web3.to_checksum_address(wallet)
+        self.token = _log_address(token)
+        self.balance = balance
+        self.block_number = block_number
+        self.deadline = deadline
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class TransferWatcher:
+    def __init__(self) -> None:
+        # provider -> waiters, and the single poller task that serves them
+        self._waiters: dict = {}
+        self._tasks: dict = {}
+
+    async def _get_logs(self, web3: AsyncWeb3, waiters: list[_Waiter], from_block: int, to_block: int) -> list:
+        # Two queries for the whole fleet, one for transfers out of the watched wallets and one for transfers in
+        tokens = sorted({waiter.token for waiter in waiters})
+        wallets = sorted({_topic(waiter.wallet) for waiter in waiters})
+        params = {"fromBlock": from_block, "toBlock": to_block, "address": tokens}
+        sent, received = await asyncio.gather(
+            web3.eth.get_logs({**params, "topics": [TRANSFER_TOPIC, wallets]}),
+            web3.eth.get_logs({**params, "topics": [TRANSFER_TOPIC, None, wallets]})
+        )
+        logs = {(log["transactionHash"], log["logIndex"]): log for log in [*sent, *received]}
+        return sorted(logs.values(), key=lambda log: (log["blockNumber"], log["logIndex"]))
+
+    async def _poll(self, web3: AsyncWeb3, waiters: list[_Waiter], to_block: int) -> None:
+        loop = asyncio.get_running_loop()
+        from_block = min(waiter.block_number for waiter in waiters) + 1
+        if from_block <= to_block:
+            logs = await self._get_logs(web3, waiters, from_block, to_block)
+        else:
+            logs = []
+
+        for waiter in list(waiters):
+            balance, changed = waiter.balance, False
+            for log in logs:
+                if log["blockNumber"] <= waiter.block_number or Web3.to_checksum_address(log["address"]) != waiter.token:
+                    continue
+                sender, recipient = (decode(["address"], topic)[0] for topic in log["topics"][1:3])
+                amount = decode(["uint256"], log["data"])[0]
+                if Web3.to_checksum_address(sender) == waiter.wallet:
+                    balance, changed = balance - amount, True
+                if Web3.to_checksum_address(recipient) == waiter.wallet:
+                    balance, changed = balance + amount, True
+
+            if changed and balance != waiter.balance:
+                waiter.future.set_result(balance)
+            elif loop.time() >= waiter.deadline:
+                waiter.future.set_exception(
+                    TimeExhausted(f"No transfer changed {waiter.wallet} balance of {waiter.token}")
+                )
+            else:
+                waiter.balance, waiter.block_number = balance, max(waiter.block_number, to_block)
+                continue
+            waiters.remove(waiter)
+
+    async def _run(self, web3: AsyncWeb3, waiters: list[_Waiter]) -> None:
+        # One log query per new block for every wallet waiting on this provider
+        loop = asyncio.get_running_loop()
+        try:
+            block_number = await get_block_number(web3)
+            while waiters:
+                await self._poll(web3, waiters, block_number)
+                if not waiters:
+                    break
+                remaining = max(waiter.deadline for waiter in waiters) - loop.time()
+                try:
+                    block_number = await wait_for_block(web3, block_number + 1, max(remaining, 0))
+                except TimeExhausted:
+                    pass
+        except Exception as ex:
+            for waiter in waiters:
+                if not waiter.future.done():
+                    waiter.future.set_exception(ex)
+            waiters.clear()
+
+    async def wait(
+            self,
+            web3: AsyncWeb3,
+            wallet: str,
+            token: str,
+            balance: int,
+            block_number: int,
+            timeout: float = DEFAULT_TIMEOUT
+    ) -> int:
+        # balance is the wallet's token balance at block_number, returns the balance after the first transfers past it
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(wallet, token, balance, block_number, loop.time() + timeout)
+        waiters = self._waiters.setdefault(web3.provider, [])
+        waiters.append(waiter)
+
+        task = self._tasks.get(web3.provider)
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._tasks[web3.provider] = shared_task(self._run(web3, waiters))
+        return await asyncio.shield(waiter.future)
+
+
+transfer_watcher = TransferWatcher()
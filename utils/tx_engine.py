@@ -0,0 +1,193 @@
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from loguru import logger
+from web3 import AsyncWeb3
+from web3.contract.async_contract import AsyncContractFunction
+from web3.exceptions import TransactionNotFound
+from web3.types import TxReceipt
+
+from .confirm import receipt_watcher, wait_for_transaction
+from .fees import fee_oracle
+from .gas import gas_limit_cache
+from .nonce import nonce_manager
+from .provider import wallet_affinity
+from .signer import get_address, signing_service
+from .tokens import token_registry
+
+
+class TxIntent:
+    def __init__(
+            self,
+            web3: AsyncWeb3,
+            private_key: str,
+            call: AsyncContractFunction | None = None,
+            tx: dict | None = None,
+            value: int = 0,
+            token: str | None = None,
+            fees: dict | None = None,
+            wait: bool = False,
+            gas_template: bool = True
+    ) -> None:
+        # Either a contract call to build or a ready transaction dict (e.g. from the 1inch API)
+        self.web3 = web3
+        self.private_key = private_key
+        self.address = get_address(private_key)
+        self.call = call
+        self.tx = dict(tx) if tx is not None else {}
+        self.value = value
+        self.token = token
+        self.fees = fees
+        self.wait = wait
+        self.gas_template = gas_template
+
+        self.nonce: int | None = None
+        self.signed_tx = None
+        self.tx_hash: str | None = None
+        self.receipt: TxReceipt | None = None
+        self.timings: dict[str, float] = {}
+
+
+Stage = Callable[[TxIntent], Awaitable[None]]
+
+
+async def nonce_stage(intent: TxIntent) -> None:
+    intent.nonce = await nonce_manager.reserve(intent.web3, intent.address)
+
+
+async def fee_stage(intent: TxIntent) -> None:
+    if intent.fees is None and 'gasPrice' not in intent.tx:
+        intent.fees = await fee_oracle.get_fees(intent.web3)
+
+
+async def build_stage(intent: TxIntent) -> None:
+    params = {
+        'chainId': await token_registry.get_chain_id(intent.web3),
+        'from': intent.address,
+        'nonce': intent.nonce,
+        **(intent.fees or {})
+    }
+    if intent.call is not None:
+        intent.tx = await intent.call.build_transaction({'value': intent.value, 'gas': 0, **params})
+    else:
+        intent.tx = {'value': intent.value, 'gas': 0, **intent.tx, **params}
+
+
+async def gas_stage(intent: TxIntent) -> None:
+    if not intent.tx.get('gas'):
+        intent.tx['gas'] = await gas_limit_cache.estimate(intent.web3, intent.tx, intent.token, intent.gas_template)
+
+
+async def sign_stage(intent: TxIntent) -> None:
+    intent.signed_tx = await signing_service.sign(intent.tx, intent.private_key)
+
+
+# Answers to a transaction the node may already hold, e.g. after a send that timed out
+RESENT_ERRORS = ("already known", "nonce too low")
+
+
+async def is_known(web3: AsyncWeb3, tx_hash: bytes) -> bool:
+    try:
+        await web3.eth.get_transaction(tx_hash)
+        return True
+    except TransactionNotFound:
+        return False
+
+
+async def broadcast_stage(intent: TxIntent) -> None:
+    try:
+        raw_tx_hash = await intent.web3.eth.send_raw_transaction(intent.signed_tx.rawTransaction)
+    except Exception as ex:
+        # Our own signed transaction is pending or mined, so this send did go out
+        if not any(error in str(ex).lower() for error in RESENT_ERRORS) \
+                or not await is_known(intent.web3, intent.signed_tx.hash):
+            raise
+        logger.info(f'{intent.web3.to_hex(intent.signed_tx.hash)} was already submitted | {ex}')
+        raw_tx_hash = intent.signed_tx.hash
+    intent.tx_hash = intent.web3.to_hex(raw_tx_hash)
+    await nonce_manager.mark_sent(intent.web3, intent.address, intent.nonce)
+
+
+async def confirm_stage(intent: TxIntent) -> None:
+    if intent.wait:
+        intent.receipt = await wait_for_transaction(intent.web3, intent.tx_hash)
+        if intent.gas_template:
+            gas_limit_cache.observe_receipt(intent.web3, intent.tx, intent.receipt, intent.token)
+        return
+    if not intent.gas_template:
+        return
+
+    # Nobody waits for this one, the watcher still hands its receipt to the gas cache so a revert
+    # drops the template for every other wallet
+    def observe(receipt: asyncio.Future) -> None:
+        if not receipt.cancelled() and receipt.exception() is None:
+            gas_limit_cache.observe_receipt(intent.web3, intent.tx, receipt.result(), intent.token)
+
+    receipt_watcher.watch(intent.web3, intent.tx_hash).add_done_callback(observe)
+
+
+DEFAULT_STAGES: list[tuple[str, Stage]] = [
+    ("nonce", nonce_stage),
+    ("fees", fee_stage),
+    ("build", build_stage),
+    ("gas", gas_stage),
+    ("sign", sign_stage),
+    ("broadcast", broadcast_stage),
+    ("confirm", confirm_stage),
+]
+
+
+class TxEngine:
+    def __init__(self, stages: list[tuple[str, Stage]] | None = None) -> None:
+        self.stages = list(stages or DEFAULT_STAGES)
+        self.stats: dict[str, dict[str, float]] = {}
+
+    def replace_stage(self, name: str, stage: Stage) -> None:
+        for i, (stage_name, _) in enumerate(self.stages):
+            if stage_name == name:
+                self.stages[i] = (name, stage)
+                return
+        raise KeyError(f"No stage named {name}")
+
+    def add_stage(self, name: str, stage: Stage, after: str) -> None:
+        if any(stage_name == name for stage_name, _ in self.stages):
+            return
+        for i, (stage_name, _) in enumerate(self.stages):
+            if stage_name == after:
+                self.stages.insert(i + 1, (name, stage))
+                return
+        raise KeyError(f"No stage named {after}")
+
+    def _record(self, name: str, elapsed: float) -> None:
+        stats = self.stats.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+        stats["count"] += 1
+        stats["total"] += elapsed
+        stats["max"] = max(stats["max"], elapsed)
+
+    async def submit(self, intent: TxIntent) -> TxIntent:
+        try:
+            # Nonce read, estimate, broadcast and receipt all go to the wallet's pinned endpoint
+            with wallet_affinity(intent.address):
+                for name, stage in self.stages:
+                    started = time.perf_counter()
+                    await stage(intent)
+                    intent.timings[name] = time.perf_counter() - started
+                    self._record(name, intent.timings[name])
+        except Exception as ex:
+            if intent.nonce is not None and intent.tx_hash is None:
+                await nonce_manager.release_failed(intent.web3, intent.address, intent.nonce, ex)
+            raise
+        logger.debug(
+            f'{intent.tx_hash} | ' + ', '.join(f'{name} {elapsed * 1000:.1f} ms' for name, elapsed in intent.timings.items())
+        )
+        return intent
+
+    def report(self) -> dict[str, dict[str, float]]:
+        return {
+            name: {**stats, "average": stats["total"] / stats["count"]}
+            for name, stats in self.stats.items()
+        }
+
+
+tx_engine = TxEngine()